@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк массовых начислений (бонус XP и денежный дождь в RandomEvents):
+прежний цикл `await db.add_xp(...)` на каждого участника против одного bulk_add_xp.
+Работает на временной БД через настоящий Database, с очередью записи и WAL.
+
+    python benchmarks/bulk_rewards.py --members 100 1000 5000
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+
+async def bench(members: int, guild_id: int, db: Database):
+    pairs = [(user_id, 50) for user_id in range(1, members + 1)]
+
+    started = time.perf_counter()
+    for user_id, amount in pairs:
+        await db.add_xp(guild_id, user_id, amount)
+    loop = time.perf_counter() - started
+
+    started = time.perf_counter()
+    await db.bulk_add_xp(guild_id, pairs)
+    bulk = time.perf_counter() - started
+
+    async with db.conn.execute("SELECT SUM(xp) AS total FROM users WHERE guild_id = ?", (guild_id,)) as cursor:
+        total = (await cursor.fetchone())["total"]
+    assert total == 100 * members, total
+    return loop, bulk
+
+
+async def run(sizes):
+    db = Database()
+    await db.connect()
+    try:
+        print(f"\n{'Участников':>10} {'Цикл, с':>9} {'Пачка, с':>9} {'Ускорение':>10}")
+        for guild_id, members in enumerate(sizes, start=1):
+            loop, bulk = await bench(members, guild_id, db)
+            print(f"{members:>10,} {loop:>9.3f} {bulk:>9.3f} {loop / bulk:>9.0f}x")
+    finally:
+        await db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк массовых начислений XP")
+    parser.add_argument('--members', type=int, nargs='+', default=[100, 1000, 5000], help="размеры сервера")
+    args = parser.parse_args()
+
+    # Database открывает database.db в текущей папке - работаем во временной
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        asyncio.run(run(args.members))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк CooldownManager: время и память на потоке проверок/установок кулдауна.
+Сравнивает текущий менеджер (монотонные часы, куча с вычисткой) с прежним
+(f-строка в ключе, datetime, без вычистки).
+
+    python benchmarks/cooldowns.py --calls 1000000 --users 50000
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import CooldownManager
+
+
+class LegacyCooldownManager:
+    """Прежняя реализация: записи никогда не удаляются"""
+
+    def __init__(self):
+        self.cooldowns = {}
+
+    def is_on_cooldown(self, user_id: int, action: str) -> bool:
+        key = f"{user_id}_{action}"
+        if key in self.cooldowns:
+            return datetime.utcnow() < self.cooldowns[key]
+        return False
+
+    def set_cooldown(self, user_id: int, action: str, seconds: int):
+        key = f"{user_id}_{action}"
+        self.cooldowns[key] = datetime.utcnow() + timedelta(seconds=seconds)
+
+
+def run(manager, ids, seconds: float):
+    """Поток как в Levels.reward_message: проверка и, если кулдауна нет, установка"""
+    started = time.perf_counter()
+    for user_id in ids:
+        if not manager.is_on_cooldown(user_id, "xp_gain"):
+            manager.set_cooldown(user_id, "xp_gain", seconds)
+    return time.perf_counter() - started
+
+
+def peak_memory(factory, ids, seconds: float) -> int:
+    """Отдельный прогон под tracemalloc (он сильно замедляет, поэтому время меряется без него)"""
+    manager = factory()
+    tracemalloc.start()
+    run(manager, ids, seconds)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк CooldownManager")
+    parser.add_argument('--calls', type=int, default=1_000_000, help="проверок кулдауна")
+    parser.add_argument('--users', type=int, default=50_000, help="разных пользователей")
+    parser.add_argument('--seconds', type=float, default=0.01, help="длина кулдауна")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{args.calls:,} вызовов, {args.users:,} пользователей, кулдаун {args.seconds} с\n")
+    print(f"{'Реализация':<10} {'Время, с':>9} {'мкс/вызов':>10} {'Пик памяти, МБ':>15} {'Записей':>9} {'Куча':>9}")
+    rng = random.Random(args.seed)
+    ids = [rng.randrange(args.users) for _ in range(args.calls)]
+    for name, factory in (("legacy", LegacyCooldownManager), ("current", CooldownManager)):
+        manager = factory()
+        elapsed = run(manager, ids, args.seconds)
+        peak = peak_memory(factory, ids, args.seconds)
+        heap = len(getattr(manager, "_heap", ()))
+        print(f"{name:<10} {elapsed:>9.2f} {elapsed / args.calls * 1e6:>10.2f} "
+              f"{peak / 2**20:>15.1f} {len(manager.cooldowns):>9,} {heap:>9,}")
+
+    # После истечения всех кулдаунов текущий менеджер должен опустеть
+    time.sleep(args.seconds)
+    print(f"\nПосле истечения: {len(manager):,} записей в текущем менеджере")
+
+
+if __name__ == '__main__':
+    main()
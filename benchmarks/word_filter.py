@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Бенчмарк WordFilter: автомат Ахо-Корасик против прежнего цикла
+`for word in bad_words: if word in content_lower` на сообщениях фиксированной длины.
+
+    python benchmarks/word_filter.py --sizes 10 100 1000 10000 --length 200
+"""
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from word_filter import WordFilter
+
+
+def random_word(rng: random.Random, low: int = 4, high: int = 10) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(low, high)))
+
+
+def random_message(rng: random.Random, length: int) -> str:
+    words = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(random_word(rng, 2, 8))
+    return " ".join(words)[:length]
+
+
+def substring_loop(words, text: str):
+    """Прежняя проверка AutoMod.check_bad_words"""
+    content_lower = text.lower()
+    for word in words:
+        if word in content_lower:
+            return word
+    return None
+
+
+def per_call(fn, messages, repeat: int) -> float:
+    """Среднее время одного вызова fn(message) в микросекундах"""
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for message in messages:
+            fn(message)
+    return (time.perf_counter() - started) / (repeat * len(messages)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк фильтра запрещенных слов")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000], help="размеры списка слов")
+    parser.add_argument('--length', type=int, default=200, help="длина сообщения")
+    parser.add_argument('--messages', type=int, default=500, help="разных сообщений")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    messages = [random_message(rng, args.length) for _ in range(args.messages)]
+
+    print(f"Сообщения по {args.length} символов, мкс на одно сообщение\n")
+    print(f"{'Слов':>7} {'Цикл':>10} {'Автомат':>10} {'Сборка, мс':>11}")
+    for size in args.sizes:
+        # Длинные слова почти не встречаются в случайном тексте: меряем худший случай - полный проход
+        words = [random_word(rng, 6, 12) for _ in range(size)]
+        started = time.perf_counter()
+        word_filter = WordFilter(words, leetspeak=False, homoglyphs=False)
+        build = (time.perf_counter() - started) * 1000
+        assert all((substring_loop(words, m) is None) == (word_filter.find(m) is None) for m in messages[:50])
+
+        loop = per_call(lambda m: substring_loop(words, m), messages, args.repeat)
+        automaton = per_call(word_filter.find, messages, args.repeat)
+        print(f"{size:>7,} {loop:>10.1f} {automaton:>10.1f} {build:>11.1f}")
+
+
+if __name__ == '__main__':
+    main()
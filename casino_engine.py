@@ -0,0 +1,231 @@
+"""
+Правила выплат казино без зависимости от Discord.
+Все функции возвращают валовой множитель ставки: игрок получает
+bet * multiplier монет обратно (0 - ставка проиграна, 1 - возврат).
+Этими же функциями пользуется оффлайн-симулятор casino_simulator.py.
+"""
+
+import random
+from typing import List, Optional, Sequence, Union
+
+# ==========================================
+# 🎰 СЛОТЫ
+# ==========================================
+
+SLOT_SYMBOLS = ['🍒', '🍋', '🍊', '🍇', '🍉', '⭐', '💎']
+SLOT_REELS = 3
+
+# Три одинаковых символа -> множитель (остальные тройки - SLOT_TRIPLE_DEFAULT)
+SLOT_TRIPLE_MULTIPLIERS = {'💎': 20, '⭐': 15, '🍒': 10}
+SLOT_TRIPLE_DEFAULT = 5
+SLOT_PAIR_MULTIPLIER = 2
+
+def slots_spin(rng: random.Random = random) -> List[str]:
+    """Крутит барабаны"""
+    return [rng.choice(SLOT_SYMBOLS) for _ in range(SLOT_REELS)]
+
+def slots_multiplier(reels: Sequence[str]) -> int:
+    """Множитель выигрыша для результата барабанов"""
+    a, b, c = reels
+    if a == b == c:
+        return SLOT_TRIPLE_MULTIPLIERS.get(a, SLOT_TRIPLE_DEFAULT)
+    if a == b or b == c or a == c:
+        return SLOT_PAIR_MULTIPLIER
+    return 0
+
+# ==========================================
+# 🎲 РУЛЕТКА
+# ==========================================
+
+ROULETTE_POCKETS = 37  # 0-36
+RED_NUMBERS = frozenset({1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36})
+
+ROULETTE_COLOR_ALIASES = {
+    'red': 'red', 'красное': 'red',
+    'black': 'black', 'черное': 'black',
+    'green': 'green', 'зеленое': 'green'
+}
+ROULETTE_MULTIPLIERS = {'red': 2, 'black': 2, 'green': 14, 'number': 36}
+
+def roulette_spin(rng: random.Random = random) -> int:
+    """Бросает шарик"""
+    return rng.randrange(ROULETTE_POCKETS)
+
+def roulette_color(number: int) -> str:
+    """Цвет ячейки: green / red / black"""
+    if number == 0:
+        return 'green'
+    return 'red' if number in RED_NUMBERS else 'black'
+
+def parse_roulette_choice(choice: str) -> Optional[Union[str, int]]:
+    """Приводит ставку к цвету ('red'/'black'/'green') или числу 0-36; None если ставка неверна"""
+    choice = choice.lower()
+    if choice.isdigit():
+        number = int(choice)
+        return number if number < ROULETTE_POCKETS else None
+    return ROULETTE_COLOR_ALIASES.get(choice)
+
+def roulette_multiplier(choice: Union[str, int], number: int) -> int:
+    """Множитель выигрыша для разобранной ставки и выпавшего числа"""
+    if isinstance(choice, int):
+        return ROULETTE_MULTIPLIERS['number'] if choice == number else 0
+    return ROULETTE_MULTIPLIERS[choice] if roulette_color(number) == choice else 0
+
+# ==========================================
+# 🃏 БЛЭКДЖЕК
+# ==========================================
+
+CARD_SUITS = ('♠️', '♥️', '♦️', '♣️')
+CARD_RANKS = ('2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A')
+ACE = len(CARD_RANKS) - 1
+
+# Карта - число 0..51: масть * 13 + индекс ранга. Очки и подписи считаются заранее
+CARD_VALUES = tuple(
+    11 if rank == ACE else min(rank + 2, 10)
+    for _ in CARD_SUITS for rank in range(len(CARD_RANKS))
+)
+CARD_LABELS = tuple(f"{rank}{suit}" for suit in CARD_SUITS for rank in CARD_RANKS)
+FULL_DECK = tuple(range(len(CARD_LABELS)))
+
+DEALER_STANDS_AT = 17
+BLACKJACK_NATURAL_MULTIPLIER = 2.5  # 21 с двух карт
+BLACKJACK_WIN_MULTIPLIER = 2
+BLACKJACK_PUSH_MULTIPLIER = 1
+
+def card_value(card: int) -> int:
+    """Очки карты (туз считается как 11)"""
+    return CARD_VALUES[card]
+
+def is_ace(card: int) -> bool:
+    return card % len(CARD_RANKS) == ACE
+
+class Deck:
+    """Колода, собранная один раз; перемешивается на месте, карты берутся по указателю"""
+
+    __slots__ = ("cards", "position", "rng")
+
+    def __init__(self, rng: random.Random = random):
+        self.cards = list(FULL_DECK)
+        self.position = 0
+        self.rng = rng
+
+    def shuffle(self):
+        self.rng.shuffle(self.cards)
+        self.position = 0
+
+    def draw(self) -> int:
+        card = self.cards[self.position]
+        self.position += 1
+        return card
+
+class Hand:
+    """Рука с очками, пересчитываемыми при каждой добавленной карте"""
+
+    __slots__ = ("cards", "value", "soft_aces")
+
+    def __init__(self):
+        self.cards: List[int] = []
+        self.value = 0
+        # Тузы, которые еще считаются за 11
+        self.soft_aces = 0
+
+    def clear(self):
+        self.cards.clear()
+        self.value = 0
+        self.soft_aces = 0
+
+    def add(self, card: int) -> int:
+        """Добавляет карту; туз становится единицей, только если иначе перебор"""
+        self.cards.append(card)
+        self.value += CARD_VALUES[card]
+        if is_ace(card):
+            self.soft_aces += 1
+        while self.value > 21 and self.soft_aces:
+            self.value -= 10
+            self.soft_aces -= 1
+        return self.value
+
+    def format(self) -> str:
+        """Текстовое представление руки"""
+        return ' '.join(CARD_LABELS[card] for card in self.cards)
+
+def dealer_should_hit(value: int) -> bool:
+    """Дилер берет карты, пока у него меньше DEALER_STANDS_AT"""
+    return value < DEALER_STANDS_AT
+
+def blackjack_multiplier(player_value: int, dealer_value: int, natural: bool = False) -> float:
+    """
+    Множитель выплаты по итогам раздачи.
+    natural - у игрока 21 с двух карт (оплачивается сразу, рука дилера не играет).
+    """
+    if natural:
+        return BLACKJACK_NATURAL_MULTIPLIER
+    if player_value > 21:
+        return 0
+    if dealer_value > 21 or player_value > dealer_value:
+        return BLACKJACK_WIN_MULTIPLIER
+    if player_value == dealer_value:
+        return BLACKJACK_PUSH_MULTIPLIER
+    return 0
+
+class BlackjackRound:
+    """
+    Одна раздача блэкджека по правилам бота.
+    Объект можно переиспользовать: deal() перемешивает ту же колоду и очищает руки.
+    После завершения finished = True, а multiplier - множитель выплаты.
+    """
+
+    __slots__ = ("deck", "player", "dealer", "finished", "natural", "multiplier")
+
+    def __init__(self, rng: random.Random = random):
+        self.deck = Deck(rng)
+        self.player = Hand()
+        self.dealer = Hand()
+        self.finished = False
+        self.natural = False
+        self.multiplier = 0
+
+    def deal(self) -> "BlackjackRound":
+        """Раздает по две карты; 21 у игрока сразу завершает раздачу"""
+        deck, player, dealer = self.deck, self.player, self.dealer
+        deck.shuffle()
+        player.clear()
+        dealer.clear()
+        player.add(deck.draw())
+        player.add(deck.draw())
+        dealer.add(deck.draw())
+        dealer.add(deck.draw())
+
+        self.natural = player.value == 21
+        self.finished = self.natural
+        self.multiplier = blackjack_multiplier(player.value, dealer.value, natural=True) if self.natural else 0
+        return self
+
+    def hit(self) -> int:
+        """Игрок берет карту; перебор завершает раздачу"""
+        value = self.player.add(self.deck.draw())
+        if value > 21:
+            self.finished = True
+            self.multiplier = blackjack_multiplier(value, self.dealer.value)
+        return value
+
+    def stand(self) -> float:
+        """Игрок останавливается, дилер добирает карты, раздача завершается"""
+        dealer, deck = self.dealer, self.deck
+        while dealer_should_hit(dealer.value):
+            dealer.add(deck.draw())
+        self.finished = True
+        self.multiplier = blackjack_multiplier(self.player.value, dealer.value)
+        return self.multiplier
+
+# ==========================================
+# 💰 ОБЩЕЕ
+# ==========================================
+
+def payout(bet: int, multiplier: float) -> int:
+    """Валовая выплата: сколько монет вернуть игроку после игры (ставка уже списана)"""
+    return int(bet * multiplier)
+
+def net_winnings(bet: int, multiplier: float) -> int:
+    """Изменение баланса игрока: выплата минус ставка"""
+    return payout(bet, multiplier) - bet
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Оффлайн-симулятор казино: RTP, дисперсия и влияние на денежную массу.
+Использует те же функции выплат, что и бот (casino_engine.py).
+
+Слоты и рулетка считаются векторно: все исходы раунда перебираются один раз
+через casino_engine, из них строится таблица множителей, а симуляция -
+это выборка индексов NumPy по таблице. Та же таблица дает точный RTP.
+Блэкджек зависит от решений игрока, поэтому он играется раздачами через engine.
+
+NumPy нужен только здесь, в зависимости бота он не входит:
+    pip install numpy
+    python casino_simulator.py --rounds 100000000
+"""
+
+import argparse
+import itertools
+import random
+import sys
+import time
+
+import casino_engine as engine
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# ==========================================
+# ТАБЛИЦЫ ИСХОДОВ
+# ==========================================
+
+def slots_table():
+    """Множители для всех SLOT_SYMBOLS ** SLOT_REELS исходов (индекс в системе счисления по символам)"""
+    return np.array([
+        engine.slots_multiplier(reels)
+        for reels in itertools.product(engine.SLOT_SYMBOLS, repeat=engine.SLOT_REELS)
+    ], dtype=np.float64)
+
+def roulette_table(choice):
+    """Множители для каждой ячейки рулетки при ставке choice"""
+    return np.array([
+        engine.roulette_multiplier(choice, number)
+        for number in range(engine.ROULETTE_POCKETS)
+    ], dtype=np.float64)
+
+# ==========================================
+# СИМУЛЯЦИЯ
+# ==========================================
+
+class Stats:
+    """Накопитель сумм по чистому выигрышу (в монетах) на раунд"""
+
+    def __init__(self, bet):
+        self.bet = bet
+        self.rounds = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def add(self, net):
+        self.rounds += len(net)
+        self.total += float(net.sum())
+        self.total_sq += float(np.square(net).sum())
+
+    def add_one(self, net):
+        self.rounds += 1
+        self.total += net
+        self.total_sq += net * net
+
+    @property
+    def mean(self):
+        return self.total / self.rounds if self.rounds else 0.0
+
+    @property
+    def rtp(self):
+        """Возврат игроку: выплаты / ставки"""
+        return 1 + self.mean / self.bet
+
+    @property
+    def variance(self):
+        """Дисперсия чистого выигрыша на раунд в единицах ставки"""
+        if not self.rounds:
+            return 0.0
+        mean = self.mean / self.bet
+        return self.total_sq / self.bet ** 2 / self.rounds - mean * mean
+
+    @property
+    def per_1k(self):
+        """Сколько монет 1000 ставок добавляют в экономику (минус - изымают)"""
+        return self.mean * 1000
+
+def simulate_table(table, rounds, bet, rng, chunk):
+    """Векторная симуляция по таблице множителей с равновероятными исходами"""
+    # Чистый выигрыш в монетах с тем же округлением, что и в боте
+    net_table = np.array([engine.net_winnings(bet, m) for m in table], dtype=np.float64)
+    stats = Stats(bet)
+    left = rounds
+    while left > 0:
+        size = min(chunk, left)
+        outcomes = rng.integers(0, len(table), size=size)
+        stats.add(net_table[outcomes])
+        left -= size
+    exact_rtp = float(np.mean(table))
+    return stats, exact_rtp
+
+def play_blackjack(game, bet, stand_at):
+    """Одна раздача по правилам бота; игрок добирает, пока у него меньше stand_at"""
+    game.deal()
+    while not game.finished and game.player.value < stand_at:
+        game.hit()
+    if not game.finished:
+        game.stand()
+    return engine.net_winnings(bet, game.multiplier)
+
+def simulate_blackjack(rounds, bet, stand_at, seed):
+    # Одна раздача на всю симуляцию: колода и руки переиспользуются
+    game = engine.BlackjackRound(random.Random(seed))
+    stats = Stats(bet)
+    for _ in range(rounds):
+        stats.add_one(play_blackjack(game, bet, stand_at))
+    return stats
+
+# ==========================================
+# ОТЧЕТ
+# ==========================================
+
+def report(name, stats, elapsed, exact_rtp=None):
+    exact = f"  точный RTP {exact_rtp:8.4%}" if exact_rtp is not None else ""
+    speed = stats.rounds / elapsed / 1e6 if elapsed else 0.0
+    print(
+        f"{name:<22} RTP {stats.rtp:8.4%}{exact}  дисперсия {stats.variance:9.3f}  "
+        f"на 1k ставок {stats.per_1k:+12,.0f}  ({stats.rounds:,} раундов, {speed:.1f}M/с)"
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Симулятор RTP казино бота")
+    parser.add_argument('--rounds', type=int, default=10_000_000, help="раундов слотов и каждой ставки рулетки")
+    parser.add_argument('--bj-rounds', type=int, default=200_000, help="раздач блэкджека")
+    parser.add_argument('--bj-stand', type=int, default=17, help="игрок в блэкджеке останавливается на N очков")
+    parser.add_argument('--bet', type=int, default=100, help="размер ставки в монетах")
+    parser.add_argument('--chunk', type=int, default=10_000_000, help="раундов за одну выборку NumPy")
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    if np is None:
+        print("❌ Нужен NumPy: pip install numpy")
+        sys.exit(1)
+
+    rng = np.random.default_rng(args.seed)
+    print(f"🎰 Ставка {args.bet} монет\n")
+
+    games = [("Слоты", slots_table())]
+    games += [
+        (f"Рулетка: {choice}", roulette_table(choice))
+        for choice in ('red', 'black', 'green', 17)
+    ]
+    for name, table in games:
+        started = time.perf_counter()
+        stats, exact_rtp = simulate_table(table, args.rounds, args.bet, rng, args.chunk)
+        report(name, stats, time.perf_counter() - started, exact_rtp)
+
+    started = time.perf_counter()
+    stats = simulate_blackjack(args.bj_rounds, args.bet, args.bj_stand, args.seed)
+    report(f"Блэкджек (стоп {args.bj_stand})", stats, time.perf_counter() - started)
+
+if __name__ == '__main__':
+    main()
@@ -1,146 +1,363 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 import re
+import time
+import asyncio
+from collections import deque
+from typing import Dict, NamedTuple
 from database import db
-from utils import EmbedBuilder
+from utils import EmbedBuilder, MessageInfo
+from word_filter import WordFilter
 from config import Config
 import logging
 
 logger = logging.getLogger('DiscordBot.AutoMod')
 
+class AutoModRules(NamedTuple):
+    """Скомпилированные правила автомодерации сервера (неизменяемые, меняются целиком)"""
+    spam_threshold: int = 5         # сообщений
+    spam_interval: float = 5        # секунд
+    duplicate_threshold: int = 4    # одинаковых сообщений
+    duplicate_interval: float = 30  # секунд
+    duplicate_min_length: int = 20  # короткие фразы ("с днем рождения") не проверяем
+    duplicate_min_unique: int = 8   # и тексты из пары букв ("хахахаха...")
+    caps_min_length: int = 10       # символов
+    caps_ratio: float = 0.7         # доля заглавных
+    max_mentions: int = 5
+    whole_words: bool = False       # искать запрещенные слова только целиком
+    words: tuple = ()
+    word_filter: WordFilter = WordFilter()
+
+# Настраиваемые правила: ключ -> (тип, минимум, максимум, описание)
+RULE_SETTINGS = {
+    "spam_threshold": (int, 1, 100, "Сообщений за окно антиспама"),
+    "spam_interval": (float, 1, 300, "Окно антиспама (сек)"),
+    "duplicate_threshold": (int, 2, 100, "Одинаковых сообщений до удаления"),
+    "duplicate_interval": (float, 1, 3600, "Окно повторов (сек)"),
+    "duplicate_min_length": (int, 1, 500, "Мин. длина текста для проверки повторов"),
+    "duplicate_min_unique": (int, 1, 100, "Мин. разных символов в тексте для проверки повторов"),
+    "caps_min_length": (int, 1, 2000, "Мин. длина сообщения для проверки капса"),
+    "caps_ratio": (float, 0.1, 1, "Доля заглавных букв"),
+    "max_mentions": (int, 1, 100, "Максимум упоминаний"),
+    "whole_words": (int, 0, 1, "Искать слова только целиком (0/1)"),
+}
+
+def parse_rule_value(key: str, value: str):
+    """Проверяет и приводит значение настройки. ValueError - если не подходит"""
+    cast, minimum, maximum, _ = RULE_SETTINGS[key]
+    parsed = cast(value)
+    if not minimum <= parsed <= maximum:
+        raise ValueError(f"{key} должен быть от {minimum} до {maximum}")
+    return parsed
+
+def compile_rules(settings: Dict[str, str], words) -> AutoModRules:
+    """Собирает правила сервера из сырых значений БД"""
+    values = {}
+    for key, raw in settings.items():
+        if key not in RULE_SETTINGS:
+            continue
+        try:
+            values[key] = parse_rule_value(key, raw)
+        except ValueError:
+            logger.warning(f"Некорректное правило автомода {key}={raw}, использую значение по умолчанию")
+    
+    values["whole_words"] = bool(values.get("whole_words", False))
+    words = tuple(sorted(words))
+    return AutoModRules(
+        **values,
+        words=words,
+        word_filter=WordFilter(words, whole_words=values["whole_words"])
+    )
+
+class ModerationQueue:
+    """
+    Очередь действий модерации по каналам.
+    За окно window удаления собираются в один channel.delete_messages,
+    а предупреждения - в одно сводное сообщение.
+    """
+    
+    BULK_LIMIT = 100  # Максимум сообщений в одном bulk delete
+    MAX_MENTIONS_SHOWN = 20
+    
+    def __init__(self, window: float = 1.0):
+        self.window = window
+        # channel_id -> {"channel", "messages", "warnings": {причина: {mention: None}}, "since"}
+        self.pending: Dict[int, dict] = {}
+        self._tasks: Dict[int, asyncio.Task] = {}
+        self.flushes = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+    
+    def enqueue(self, message: discord.Message, reason: str):
+        """Ставит сообщение на удаление, а автора - в сводку предупреждений"""
+        channel = message.channel
+        batch = self.pending.get(channel.id)
+        if batch is None:
+            batch = self.pending[channel.id] = {
+                "channel": channel,
+                "messages": [],
+                "warnings": {},
+                "since": time.monotonic()
+            }
+            self._tasks[channel.id] = asyncio.create_task(self._flush_later(channel.id))
+        
+        batch["messages"].append(message)
+        batch["warnings"].setdefault(reason, {})[message.author.mention] = None
+    
+    async def _flush_later(self, channel_id: int):
+        await asyncio.sleep(self.window)
+        self._tasks.pop(channel_id, None)
+        await self.flush(channel_id)
+    
+    async def flush(self, channel_id: int):
+        """Удаляет накопленные сообщения и отправляет одно сводное предупреждение"""
+        batch = self.pending.pop(channel_id, None)
+        if batch is None:
+            return
+        
+        channel = batch["channel"]
+        messages = batch["messages"]
+        
+        for i in range(0, len(messages), self.BULK_LIMIT):
+            chunk = messages[i:i + self.BULK_LIMIT]
+            try:
+                if len(chunk) == 1:
+                    await chunk[0].delete()
+                else:
+                    await channel.delete_messages(chunk)
+            except discord.NotFound:
+                pass
+            except discord.HTTPException as e:
+                logger.warning(f"Не удалось удалить {len(chunk)} сообщений в #{channel}: {e}")
+        
+        lines = []
+        for reason, mentions in batch["warnings"].items():
+            shown = list(mentions)[:self.MAX_MENTIONS_SHOWN]
+            extra = len(mentions) - len(shown)
+            lines.append(f"**{reason}:** {', '.join(shown)}" + (f" и еще {extra}" if extra else ""))
+        
+        embed = EmbedBuilder.warning("Автомодерация", "\n".join(lines))
+        embed.set_footer(text=f"Удалено сообщений: {len(messages)}")
+        try:
+            await channel.send(embed=embed, delete_after=5)
+        except discord.HTTPException:
+            pass
+        
+        latency = time.monotonic() - batch["since"]
+        self.flushes += 1
+        self.total_latency += latency
+        self.max_latency = max(self.max_latency, latency)
+    
+    async def close(self):
+        """Отменяет таймеры и сразу выполняет все накопленное"""
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        for channel_id in list(self.pending):
+            await self.flush(channel_id)
+    
+    def stats(self) -> dict:
+        """Глубина очереди и задержка от первого нарушения до выполнения пачки"""
+        return {
+            "depth": sum(len(batch["messages"]) for batch in self.pending.values()),
+            "channels": len(self.pending),
+            "flushes": self.flushes,
+            "avg_latency": self.total_latency / self.flushes if self.flushes else 0.0,
+            "max_latency": self.max_latency
+        }
+
 class AutoMod(commands.Cog):
     """Система автомодерации"""
     
     def __init__(self, bot):
         self.bot = bot
         
-        # Настройки автомодерации (можно вынести в БД)
-        self.spam_threshold = 5  # сообщений
-        self.spam_interval = 5  # секунд
-        self.user_messages = {}  # кэш сообщений
+        # Правила по серверам: guild_id -> AutoModRules (проверка сообщения не ходит в БД)
+        self.default_rules = AutoModRules()
+        self.rules: Dict[int, AutoModRules] = {}
+        # Сырые значения из БД, из которых собраны правила
+        self.raw_settings: Dict[int, Dict[str, str]] = {}
+        self.raw_words: Dict[int, set] = {}
         
-        # Запрещенные слова
-        self.bad_words = [
-            # Добавь свои слова
-        ]
+        self.user_messages = {}  # (guild_id, user_id) -> deque отметок времени за окно
+        
+        # Повторы одного текста (рейды копипастой по каналам)
+        # guild_id -> {отпечаток: deque[(время, user_id, channel_id)]}
+        self.fingerprints = {}
+        # guild_id -> deque[(время, отпечаток)] в порядке поступления, для вычистки по TTL
+        self.fingerprint_log = {}
         
+        # Удаления и предупреждения копятся по каналам и уходят пачкой
+        self.actions = ModerationQueue(window=1.0)
+        
+        self.evict_idle_users.start()
         logger.info("✅ AutoMod инициализирован")
     
-    @commands.Cog.listener()
-    async def on_message(self, message):
-        """Проверяет сообщения на нарушения"""
-        # Игнорируем ботов и админов
-        if message.author.bot or not message.guild:
-            return
-        
-        if message.author.guild_permissions.administrator:
-            return
+    async def cog_load(self):
+        self.raw_settings = await db.get_automod_settings()
+        self.raw_words = {guild_id: set(words) for guild_id, words in (await db.get_automod_words()).items()}
+        for guild_id in set(self.raw_settings) | set(self.raw_words):
+            self.recompile_rules(guild_id)
+        logger.info(f"Загружены правила автомода для {len(self.rules)} серверов")
         
-        # Антиспам
-        if await self.check_spam(message):
-            return
+        self.bot.pipeline.register("moderate", "automod", self.moderate_message)
+    
+    async def cog_unload(self):
+        self.bot.pipeline.unregister("automod")
+        self.evict_idle_users.cancel()
+        await self.actions.close()
+    
+    def get_rules(self, guild_id: int) -> AutoModRules:
+        """Правила сервера из памяти"""
+        return self.rules.get(guild_id, self.default_rules)
+    
+    def recompile_rules(self, guild_id: int):
+        """Пересобирает правила сервера и атомарно подменяет их"""
+        self.rules[guild_id] = compile_rules(
+            self.raw_settings.get(guild_id, {}),
+            self.raw_words.get(guild_id, ())
+        )
+    
+    @tasks.loop(minutes=5)
+    async def evict_idle_users(self):
+        """Удаляет окна антиспама молчащих пользователей (память ~ числу активных)"""
+        now = time.monotonic()
+        idle = [
+            key for key, timestamps in self.user_messages.items()
+            if not timestamps or now - timestamps[-1] >= self.get_rules(key[0]).spam_interval
+        ]
+        for key in idle:
+            del self.user_messages[key]
         
-        # Проверка на запрещенные слова
-        if await self.check_bad_words(message):
-            return
+        for guild_id in list(self.fingerprint_log):
+            self.evict_fingerprints(guild_id, now, self.get_rules(guild_id))
+    
+    async def moderate_message(self, info: MessageInfo) -> bool:
+        """Стадия moderate: проверяет сообщения на нарушения. True - сообщение удалено"""
+        # Админов не проверяем
+        if info.is_admin:
+            return False
         
-        # Проверка на caps
-        if await self.check_caps(message):
-            return
+        message = info.message
+        rules = self.get_rules(info.guild.id)
         
-        # Проверка на массовые упоминания
-        if await self.check_mass_mentions(message):
-            return
+        return (
+            await self.check_spam(message, rules)              # Антиспам
+            or await self.check_duplicates(message, rules)     # Копипаста по каналам
+            or await self.check_bad_words(message, rules)      # Запрещенные слова
+            or await self.check_caps(message, rules)           # Капс
+            or await self.check_mass_mentions(message, rules)  # Массовые упоминания
+        )
     
-    async def check_spam(self, message):
-        """Проверка на спам"""
-        import time
-        
-        user_id = message.author.id
-        current_time = time.time()
+    async def check_spam(self, message, rules: AutoModRules):
+        """Проверка на спам (скользящее окно, O(1) амортизированно)"""
+        key = (message.guild.id, message.author.id)
+        current_time = time.monotonic()
         
-        # Инициализируем данные пользователя
-        if user_id not in self.user_messages:
-            self.user_messages[user_id] = []
+        # Для проверки хватает последних spam_threshold + 1 отметок
+        timestamps = self.user_messages.get(key)
+        if timestamps is None or timestamps.maxlen != rules.spam_threshold + 1:
+            timestamps = self.user_messages[key] = deque(timestamps or (), maxlen=rules.spam_threshold + 1)
         
         # Добавляем сообщение
-        self.user_messages[user_id].append(current_time)
+        timestamps.append(current_time)
         
-        # Удаляем старые сообщения
-        self.user_messages[user_id] = [
-            t for t in self.user_messages[user_id]
-            if current_time - t < self.spam_interval
-        ]
+        # Удаляем вышедшие из окна отметки
+        while current_time - timestamps[0] >= rules.spam_interval:
+            timestamps.popleft()
         
         # Проверяем спам
-        if len(self.user_messages[user_id]) > self.spam_threshold:
-            try:
-                await message.delete()
-                await message.channel.send(
-                    f"{message.author.mention} не спамь!",
-                    delete_after=3
-                )
-                logger.warning(f"Спам от {message.author}")
-                return True
-            except:
-                pass
+        if len(timestamps) > rules.spam_threshold:
+            self.actions.enqueue(message, "Не спамь")
+            logger.warning(f"Спам от {message.author}")
+            return True
+        
+        return False
+    
+    def fingerprint(self, content: str, min_length: int, min_unique: int = 1):
+        """
+        Отпечаток текста без регистра, пробелов и знаков препинания.
+        None - текст слишком короткий или однообразный: такие фразы совпадают у разных людей сами собой
+        """
+        normalized = re.sub(r"[\W_]+", "", content.lower())
+        if len(normalized) < min_length or len(set(normalized)) < min_unique:
+            return None
+        return hash(normalized)
+    
+    def evict_fingerprints(self, guild_id: int, now: float, rules: AutoModRules):
+        """Удаляет отпечатки старше окна (каждая запись удаляется ровно один раз)"""
+        log = self.fingerprint_log.get(guild_id)
+        if log is None:
+            return
+        fingerprints = self.fingerprints[guild_id]
+        
+        while log and now - log[0][0] >= rules.duplicate_interval:
+            _, fp = log.popleft()
+            entries = fingerprints[fp]
+            entries.popleft()
+            if not entries:
+                del fingerprints[fp]
+        
+        if not log:
+            del self.fingerprint_log[guild_id]
+            del self.fingerprints[guild_id]
+    
+    async def check_duplicates(self, message, rules: AutoModRules):
+        """Проверка на один и тот же текст от разных людей/в разных каналах"""
+        fp = self.fingerprint(message.content, rules.duplicate_min_length, rules.duplicate_min_unique)
+        if fp is None:
+            return False
+        
+        guild_id = message.guild.id
+        now = time.monotonic()
+        self.evict_fingerprints(guild_id, now, rules)
+        
+        entries = self.fingerprints.setdefault(guild_id, {}).setdefault(fp, deque())
+        entries.append((now, message.author.id, message.channel.id))
+        self.fingerprint_log.setdefault(guild_id, deque()).append((now, fp))
+        
+        if len(entries) >= rules.duplicate_threshold:
+            self.actions.enqueue(message, "Повторяющиеся сообщения")
+            users = len({user_id for _, user_id, _ in entries})
+            channels = len({channel_id for _, _, channel_id in entries})
+            logger.warning(
+                f"Копипаста от {message.author}: {len(entries)} повторов, "
+                f"{users} пользователей, {channels} каналов"
+            )
+            return True
         
         return False
     
-    async def check_bad_words(self, message):
+    async def check_bad_words(self, message, rules: AutoModRules):
         """Проверка на мат"""
-        content_lower = message.content.lower()
-        
-        for word in self.bad_words:
-            if word in content_lower:
-                try:
-                    await message.delete()
-                    embed = EmbedBuilder.warning(
-                        "Неприемлемое слово",
-                        f"{message.author.mention} следи за своим языком!"
-                    )
-                    await message.channel.send(embed=embed, delete_after=5)
-                    logger.warning(f"Мат от {message.author}: {word}")
-                    return True
-                except:
-                    pass
+        word = rules.word_filter.find(message.content)
+        
+        if word is not None:
+            self.actions.enqueue(message, "Следи за языком")
+            logger.warning(f"Мат от {message.author}: {word}")
+            return True
         
         return False
     
-    async def check_caps(self, message):
+    async def check_caps(self, message, rules: AutoModRules):
         """Проверка на капс"""
-        if len(message.content) < 10:
+        if len(message.content) < rules.caps_min_length:
             return False
         
         caps_count = sum(1 for c in message.content if c.isupper())
-        if caps_count / len(message.content) > 0.7:
-            try:
-                await message.delete()
-                await message.channel.send(
-                    f"{message.author.mention} не кричи!",
-                    delete_after=3
-                )
-                logger.warning(f"Капс от {message.author}")
-                return True
-            except:
-                pass
+        if caps_count / len(message.content) > rules.caps_ratio:
+            self.actions.enqueue(message, "Не кричи")
+            logger.warning(f"Капс от {message.author}")
+            return True
         
         return False
     
-    async def check_mass_mentions(self, message):
+    async def check_mass_mentions(self, message, rules: AutoModRules):
         """Проверка на массовые упоминания"""
-        if len(message.mentions) > 5:
-            try:
-                await message.delete()
-                embed = EmbedBuilder.warning(
-                    "Массовые упоминания",
-                    f"{message.author.mention} не спамь упоминаниями!"
-                )
-                await message.channel.send(embed=embed, delete_after=5)
-                logger.warning(f"Массовые упоминания от {message.author}")
-                return True
-            except:
-                pass
+        if len(message.mentions) > rules.max_mentions:
+            self.actions.enqueue(message, "Не спамь упоминаниями")
+            logger.warning(f"Массовые упоминания от {message.author}")
+            return True
         
         return False
     
@@ -152,6 +369,8 @@ class AutoMod(commands.Cog):
         
         Требуемые права: Administrator
         """
+        rules = self.get_rules(ctx.guild.id)
+        
         embed = discord.Embed(
             title="🛡️ Автомодерация",
             description="Система автоматической модерации активна",
@@ -160,23 +379,134 @@ class AutoMod(commands.Cog):
         
         embed.add_field(
             name="📊 Настройки",
-            value=f"• Антиспам: {self.spam_threshold} сообщений за {self.spam_interval}с\n"
-                 f"• Фильтр мата: {len(self.bad_words)} слов\n"
-                 f"• Проверка капса: Включена\n"
-                 f"• Проверка упоминаний: Макс 5",
+            value=f"• Антиспам: {rules.spam_threshold} сообщений за {rules.spam_interval:g}с\n"
+                 f"• Повторы: {rules.duplicate_threshold} одинаковых за {rules.duplicate_interval:g}с "
+                 f"(от {rules.duplicate_min_length} символов)\n"
+                 f"• Фильтр мата: {len(rules.words)} слов{' (целиком)' if rules.whole_words else ''}\n"
+                 f"• Проверка капса: от {rules.caps_min_length} символов, > {rules.caps_ratio:.0%}\n"
+                 f"• Проверка упоминаний: Макс {rules.max_mentions}",
+            inline=False
+        )
+        
+        stats = self.actions.stats()
+        embed.add_field(
+            name="📬 Очередь действий",
+            value=f"• В очереди: {stats['depth']} сообщений ({stats['channels']} каналов)\n"
+                 f"• Пачек отправлено: {stats['flushes']}\n"
+                 f"• Задержка: сред. {stats['avg_latency']:.2f}с, макс. {stats['max_latency']:.2f}с",
             inline=False
         )
         
         embed.add_field(
             name="✅ Защищает от",
             value="• Спама сообщениями\n"
+                 f"• Копипасты по каналам\n"
                  f"• Запрещенных слов\n"
                  f"• Капса\n"
                  f"• Массовых упоминаний",
             inline=False
         )
         
+        embed.set_footer(text=f"Изменить: {Config.PREFIX}automodset <ключ> <значение> • {Config.PREFIX}automodword add/remove <слово>")
+        
+        await ctx.send(embed=embed)
+    
+    @commands.command(name='automodset', aliases=['автомод-настройка'])
+    @commands.has_permissions(administrator=True)
+    async def automod_set(self, ctx, key: str = None, value: str = None):
+        """
+        ⚙️ Изменить правило автомодерации
+        
+        Использование:
+        !automodset - список настроек
+        !automodset spam_threshold 7 - 7 сообщений за окно
+        
+        Требуемые права: Administrator
+        """
+        if key is None or value is None:
+            embed = discord.Embed(
+                title="⚙️ Настройки автомодерации",
+                description="\n".join(
+                    f"`{name}` - {desc} ({minimum}–{maximum})"
+                    for name, (_, minimum, maximum, desc) in RULE_SETTINGS.items()
+                ),
+                color=Config.COLOR_INFO
+            )
+            return await ctx.send(embed=embed)
+        
+        key = key.lower()
+        if key not in RULE_SETTINGS:
+            embed = EmbedBuilder.error("Неизвестная настройка", f"Список: `{Config.PREFIX}automodset`")
+            return await ctx.send(embed=embed, delete_after=10)
+        
+        try:
+            parsed = parse_rule_value(key, value)
+        except ValueError as e:
+            embed = EmbedBuilder.error("Неверное значение", str(e))
+            return await ctx.send(embed=embed, delete_after=10)
+        
+        if not await db.set_automod_setting(ctx.guild.id, key, str(parsed)):
+            embed = EmbedBuilder.error("Ошибка", "Не удалось сохранить настройку")
+            return await ctx.send(embed=embed, delete_after=10)
+        
+        self.raw_settings.setdefault(ctx.guild.id, {})[key] = str(parsed)
+        self.recompile_rules(ctx.guild.id)
+        
+        embed = EmbedBuilder.success("Правило обновлено", f"`{key}` = **{parsed:g}**")
         await ctx.send(embed=embed)
+        logger.info(f"{ctx.author} изменил правило автомода {key}={parsed} на {ctx.guild}")
+    
+    @commands.command(name='automodword', aliases=['автомод-слово'])
+    @commands.has_permissions(administrator=True)
+    async def automod_word(self, ctx, action: str, *, word: str):
+        """
+        🚫 Добавить/убрать запрещенное слово
+        
+        Использование:
+        !automodword add слово
+        !automodword remove слово
+        
+        Требуемые права: Administrator
+        """
+        action = action.lower()
+        word = word.strip().lower()
+        guild_words = self.raw_words.setdefault(ctx.guild.id, set())
+        
+        if action in ('add', 'добавить'):
+            if word in guild_words:
+                embed = EmbedBuilder.warning("Не добавлено", "Это слово уже есть в списке")
+                return await ctx.send(embed=embed, delete_after=10)
+            saved = await db.add_automod_word(ctx.guild.id, word)
+            text = "добавлено в"
+        elif action in ('remove', 'убрать'):
+            if word not in guild_words:
+                embed = EmbedBuilder.warning("Не найдено", "Этого слова нет в списке")
+                return await ctx.send(embed=embed, delete_after=10)
+            saved = await db.remove_automod_word(ctx.guild.id, word)
+            text = "убрано из"
+        else:
+            embed = EmbedBuilder.error("Ошибка", "Действие: `add` или `remove`")
+            return await ctx.send(embed=embed, delete_after=10)
+        
+        if not saved:
+            embed = EmbedBuilder.error("Ошибка", "Не удалось сохранить список слов")
+            return await ctx.send(embed=embed, delete_after=10)
+        
+        if action in ('add', 'добавить'):
+            guild_words.add(word)
+        else:
+            guild_words.discard(word)
+        
+        self.recompile_rules(ctx.guild.id)
+        
+        # Не светим слово в канале
+        try:
+            await ctx.message.delete()
+        except discord.HTTPException:
+            pass
+        
+        embed = EmbedBuilder.success("Список слов обновлен", f"Слово {text} фильтр. Всего слов: **{len(guild_words)}**")
+        await ctx.send(embed=embed, delete_after=10)
 
 async def setup(bot):
     await bot.add_cog(AutoMod(bot))
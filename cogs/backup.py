@@ -1,8 +1,8 @@
 import discord
 from discord.ext import commands, tasks
-import shutil
 import os
 from datetime import datetime
+from database import db
 from utils import EmbedBuilder
 from config import Config
 import logging
@@ -48,8 +48,8 @@ class Backup(commands.Cog):
         backup_name = f"database_backup_{timestamp}.db"
         backup_path = os.path.join(self.backup_dir, backup_name)
         
-        # Копируем БД
-        shutil.copy2("database.db", backup_path)
+        # Копируем БД (согласованный снимок, даже если идет запись)
+        await db.backup(backup_path)
         
         # Удаляем старые бэкапы (оставляем последние 7)
         backups = sorted([f for f in os.listdir(self.backup_dir) if f.endswith('.db')])
@@ -128,5 +128,69 @@ class Backup(commands.Cog):
         
         await ctx.send(embed=embed)
 
+    @commands.command(name='dbstats', aliases=['бдстат'])
+    @commands.is_owner()
+    async def db_stats(self, ctx, limit: int = 10):
+        """
+        📊 Статистика базы данных
+        
+        Самые затратные методы Database (вызовы, p50/p95/p99, строки),
+        очередь записи, кэш пользователей и конвейер сообщений
+        
+        Только для владельца бота
+        """
+        await ctx.send(embed=self.build_stats_embed(limit))
+    
+    def build_stats_embed(self, limit: int = 10) -> discord.Embed:
+        """Собирает embed для !dbstats"""
+        methods = db.query_stats.stats()[:max(1, min(limit, 20))]
+        
+        embed = discord.Embed(
+            title="📊 Статистика базы данных",
+            description=f"Медленных запросов (≥ {db.query_stats.slow_ms:g} мс): **{db.query_stats.slow_queries}**",
+            color=Config.COLOR_INFO
+        )
+        
+        if methods:
+            lines = [f"{'метод':<24}{'вызовы':>8}{'p50':>7}{'p95':>7}{'p99':>7}{'строк':>8}"]
+            for item in methods:
+                lines.append(
+                    f"{item['method'][:23]:<24}{item['calls']:>8}{item['p50_ms']:>7.1f}"
+                    f"{item['p95_ms']:>7.1f}{item['p99_ms']:>7.1f}{item['rows']:>8}"
+                )
+            table = "\n".join(lines)
+            embed.add_field(name="⏱️ Запросы по методам (мс)", value=f"```{table[:1000]}```", inline=False)
+        
+        writes = db.writes.stats()
+        embed.add_field(
+            name="✍️ Очередь записи",
+            value=f"• В очереди: {writes['depth']} (макс. {writes['max_depth']})\n"
+                 f"• Пачек: {writes['batches']}, сред. размер {writes['avg_batch']:.1f}\n"
+                 f"• Commit: сред. {writes['avg_commit_ms']:.1f} мс, макс. {writes['max_commit_ms']:.1f} мс\n"
+                 f"• Ошибок: {writes['failed']}",
+            inline=True
+        )
+        
+        cache = db.user_cache.stats()
+        embed.add_field(
+            name="👤 Кэш пользователей",
+            value=f"• Записей: {cache['size']}/{cache['max_size']}\n"
+                 f"• Попаданий: {cache['hit_rate']:.1%}\n"
+                 f"• Промахов: {cache['misses']}",
+            inline=True
+        )
+        
+        pipeline = self.bot.pipeline.get_stats()
+        embed.add_field(
+            name="📨 Конвейер сообщений",
+            value="\n".join(
+                f"• {stage}: {item['calls']} вызовов, {item['avg_ms']:.2f} мс"
+                for stage, item in pipeline.items()
+            ) or "Нет данных",
+            inline=False
+        )
+        
+        return embed
+
 async def setup(bot):
     await bot.add_cog(Backup(bot))
@@ -1,9 +1,9 @@
 import discord
 from discord.ext import commands
-import random
 import asyncio
-from database import db
+from database import db, InsufficientFunds
 from utils import EmbedBuilder, cooldown_manager, format_number
+import casino_engine as engine
 from config import Config
 import logging
 
@@ -18,6 +18,29 @@ class Casino(commands.Cog):
         self.active_games = {}
         logger.info("✅ Casino инициализирован")
     
+    async def place_bet(self, ctx, bet: int, game: str) -> bool:
+        """
+        Списывает ставку до начала игры одним условным UPDATE (см. Database.spend_coins).
+        Если монет не хватило или запись не удалась - отвечает в канал и возвращает False.
+        """
+        try:
+            if await db.spend_coins(ctx.guild.id, ctx.author.id, bet, f"{game}:bet"):
+                return True
+            embed = EmbedBuilder.error("Ошибка", "Не удалось принять ставку, попробуй позже")
+        except InsufficientFunds as e:
+            embed = EmbedBuilder.error(
+                "Недостаточно монет",
+                f"Нужно еще {format_number(e.needed)} {Config.EMOJI_COIN}"
+            )
+        await ctx.send(embed=embed, delete_after=5)
+        return False
+    
+    async def pay_out(self, guild_id: int, user_id: int, bet: int, multiplier: float, game: str):
+        """Зачисляет валовую выплату по итогам игры (ставка списана в place_bet)"""
+        amount = engine.payout(bet, multiplier)
+        if amount:
+            await db.add_coins(guild_id, user_id, amount, f"{game}:win")
+    
     # ==========================================
     # 🎰 СЛОТЫ
     # ==========================================
@@ -41,18 +64,8 @@ class Casino(commands.Cog):
             embed = EmbedBuilder.error("Ошибка", "Минимальная ставка: 10 монет")
             return await ctx.send(embed=embed, delete_after=5)
         
-        user_data = await db.get_user(ctx.author.id)
-        
-        if user_data['coins'] < bet:
-            needed = bet - user_data['coins']
-            embed = EmbedBuilder.error(
-                "Недостаточно монет",
-                f"Нужно еще {format_number(needed)} {Config.EMOJI_COIN}"
-            )
-            return await ctx.send(embed=embed, delete_after=5)
-        
-        # Символы слотов
-        symbols = ['🍒', '🍋', '🍊', '🍇', '🍉', '⭐', '💎']
+        if not await self.place_bet(ctx, bet, "slots"):
+            return
         
         # Анимация
         embed = discord.Embed(
@@ -65,29 +78,12 @@ class Casino(commands.Cog):
         await asyncio.sleep(1)
         
         # Результат
-        result = [random.choice(symbols) for _ in range(3)]
-        
-        # Расчет выигрыша
-        multiplier = 0
-        
-        if result[0] == result[1] == result[2]:
-            # Три одинаковых
-            if result[0] == '🍒':
-                multiplier = 10
-            elif result[0] == '💎':
-                multiplier = 20
-            elif result[0] == '⭐':
-                multiplier = 15
-            else:
-                multiplier = 5
-        elif result[0] == result[1] or result[1] == result[2] or result[0] == result[2]:
-            # Две одинаковых
-            multiplier = 2
+        result = engine.slots_spin()
+        multiplier = engine.slots_multiplier(result)
+        winnings = engine.net_winnings(bet, multiplier)
         
-        winnings = int(bet * multiplier) - bet
-        
-        # Обновляем баланс
-        await db.add_coins(ctx.author.id, winnings)
+        # Выплата (ставка уже списана)
+        await self.pay_out(ctx.guild.id, ctx.author.id, bet, multiplier, "slots")
         
         # Результат
         result_text = f"**{result[0]} | {result[1]} | {result[2]}**"
@@ -112,7 +108,7 @@ class Casino(commands.Cog):
                 f"Потеряно: **{format_number(bet)}** {Config.EMOJI_COIN}"
             )
         
-        user_data = await db.get_user(ctx.author.id)
+        user_data = await db.get_user(ctx.guild.id, ctx.author.id)
         embed.set_footer(text=f"Баланс: {format_number(user_data['coins'])} монет")
         
         await msg.edit(embed=embed)
@@ -143,33 +139,22 @@ class Casino(commands.Cog):
             embed = EmbedBuilder.error("Ошибка", "Минимальная ставка: 10 монет")
             return await ctx.send(embed=embed, delete_after=5)
         
-        user_data = await db.get_user(ctx.author.id)
-        
-        if user_data['coins'] < bet:
-            needed = bet - user_data['coins']
-            embed = EmbedBuilder.error(
-                "Недостаточно монет",
-                f"Нужно еще {format_number(needed)} {Config.EMOJI_COIN}"
-            )
-            return await ctx.send(embed=embed, delete_after=5)
-        
-        choice = choice.lower()
-        
         # Проверка ставки
-        valid_choices = ['red', 'black', 'green', 'красное', 'черное', 'зеленое']
+        parsed = engine.parse_roulette_choice(choice)
         
-        if choice.isdigit():
-            number_bet = int(choice)
-            if number_bet < 0 or number_bet > 36:
+        if parsed is None:
+            if choice.isdigit():
                 embed = EmbedBuilder.error("Ошибка", "Число должно быть от 0 до 36")
-                return await ctx.send(embed=embed, delete_after=5)
-        elif choice not in valid_choices:
-            embed = EmbedBuilder.error(
-                "Ошибка",
-                "Выбери: `red/black/green` или число `0-36`"
-            )
+            else:
+                embed = EmbedBuilder.error(
+                    "Ошибка",
+                    "Выбери: `red/black/green` или число `0-36`"
+                )
             return await ctx.send(embed=embed, delete_after=5)
         
+        if not await self.place_bet(ctx, bet, "roulette"):
+            return
+        
         # Крутим рулетку
         embed = discord.Embed(
             title="🎲 РУЛЕТКА",
@@ -181,42 +166,16 @@ class Casino(commands.Cog):
         await asyncio.sleep(2)
         
         # Результат
-        result_number = random.randint(0, 36)
+        result_number = engine.roulette_spin()
+        color_emoji = {"green": "🟢", "red": "🔴", "black": "⚫"}[engine.roulette_color(result_number)]
         
-        # Определяем цвет
-        red_numbers = [1, 3, 5, 7, 9, 12, 14, 16, 18, 19, 21, 23, 25, 27, 30, 32, 34, 36]
+        # Проверяем выигрыш
+        multiplier = engine.roulette_multiplier(parsed, result_number)
+        winnings = engine.net_winnings(bet, multiplier)
         
-        if result_number == 0:
-            result_color = "green"
-            color_emoji = "🟢"
-        elif result_number in red_numbers:
-            result_color = "red"
-            color_emoji = "🔴"
-        else:
-            result_color = "black"
-            color_emoji = "⚫"
+        await self.pay_out(ctx.guild.id, ctx.author.id, bet, multiplier, "roulette")
         
-        # Проверяем выигрыш
-        won = False
-        multiplier = 0
-        
-        if choice.isdigit() and int(choice) == result_number:
-            won = True
-            multiplier = 36
-        elif choice in ['red', 'красное'] and result_color == 'red':
-            won = True
-            multiplier = 2
-        elif choice in ['black', 'черное'] and result_color == 'black':
-            won = True
-            multiplier = 2
-        elif choice in ['green', 'зеленое'] and result_color == 'green':
-            won = True
-            multiplier = 14
-        
-        if won:
-            winnings = bet * multiplier - bet
-            await db.add_coins(ctx.author.id, winnings)
-            
+        if multiplier:
             embed = EmbedBuilder.success(
                 "🎲 ВЫИГРЫШ!",
                 f"Результат: {color_emoji} **{result_number}**\n\n"
@@ -224,15 +183,13 @@ class Casino(commands.Cog):
                 f"Выигрыш: **+{format_number(winnings)}** {Config.EMOJI_COIN}"
             )
         else:
-            await db.add_coins(ctx.author.id, -bet)
-            
             embed = EmbedBuilder.error(
                 "🎲 ПРОИГРЫШ",
                 f"Результат: {color_emoji} **{result_number}**\n\n"
                 f"Потеряно: **{format_number(bet)}** {Config.EMOJI_COIN}"
             )
         
-        user_data = await db.get_user(ctx.author.id)
+        user_data = await db.get_user(ctx.guild.id, ctx.author.id)
         embed.set_footer(text=f"Баланс: {format_number(user_data['coins'])} монет")
         
         await msg.edit(embed=embed)
@@ -261,87 +218,44 @@ class Casino(commands.Cog):
             embed = EmbedBuilder.error("Ошибка", "Минимальная ставка: 10 монет")
             return await ctx.send(embed=embed, delete_after=5)
         
-        user_data = await db.get_user(ctx.author.id)
-        
-        if user_data['coins'] < bet:
-            needed = bet - user_data['coins']
-            embed = EmbedBuilder.error(
-                "Недостаточно монет",
-                f"Нужно еще {format_number(needed)} {Config.EMOJI_COIN}"
-            )
-            return await ctx.send(embed=embed, delete_after=5)
-        
         # Проверяем активную игру
         if ctx.author.id in self.active_games:
             embed = EmbedBuilder.warning("Игра уже идет", "Закончи текущую игру!")
             return await ctx.send(embed=embed, delete_after=5)
         
-        # Колода
-        suits = ['♠️', '♥️', '♦️', '♣️']
-        ranks = ['2', '3', '4', '5', '6', '7', '8', '9', '10', 'J', 'Q', 'K', 'A']
-        
-        def create_deck():
-            return [{'rank': rank, 'suit': suit} for suit in suits for rank in ranks]
-        
-        def card_value(card):
-            if card['rank'] in ['J', 'Q', 'K']:
-                return 10
-            elif card['rank'] == 'A':
-                return 11
-            else:
-                return int(card['rank'])
-        
-        def hand_value(hand):
-            value = sum(card_value(card) for card in hand)
-            aces = sum(1 for card in hand if card['rank'] == 'A')
-            
-            while value > 21 and aces:
-                value -= 10
-                aces -= 1
-            
-            return value
-        
-        def format_hand(hand):
-            return ' '.join([f"{card['rank']}{card['suit']}" for card in hand])
+        # Занимаем место до списания, чтобы вторая команда не прошла проверку выше
+        self.active_games[ctx.author.id] = None
+        if not await self.place_bet(ctx, bet, "blackjack"):
+            del self.active_games[ctx.author.id]
+            return
         
         # Раздаем карты
-        deck = create_deck()
-        random.shuffle(deck)
-        
-        player_hand = [deck.pop(), deck.pop()]
-        dealer_hand = [deck.pop(), deck.pop()]
-        
-        player_value = hand_value(player_hand)
-        dealer_value = hand_value(dealer_hand)
-        
-        # Сохраняем игру
-        self.active_games[ctx.author.id] = {
-            'bet': bet,
-            'deck': deck,
-            'player_hand': player_hand,
-            'dealer_hand': dealer_hand
-        }
+        game = engine.BlackjackRound().deal()
+        player, dealer = game.player, game.dealer
         
         # Проверка на блэкджек
-        if player_value == 21:
-            winnings = int(bet * 2.5) - bet
-            await db.add_coins(ctx.author.id, winnings)
+        if game.natural:
             del self.active_games[ctx.author.id]
+            winnings = engine.net_winnings(bet, game.multiplier)
+            await self.pay_out(ctx.guild.id, ctx.author.id, bet, game.multiplier, "blackjack")
             
             embed = discord.Embed(
                 title="🃏 БЛЭКДЖЕК!",
-                description=f"**Твои карты:** {format_hand(player_hand)} = **21**\n"
-                           f"**Карты дилера:** {format_hand(dealer_hand)} = **{dealer_value}**\n\n"
+                description=f"**Твои карты:** {player.format()} = **21**\n"
+                           f"**Карты дилера:** {dealer.format()} = **{dealer.value}**\n\n"
                            f"💰 Выигрыш: **+{format_number(winnings)}** {Config.EMOJI_COIN}",
                 color=Config.COLOR_SUCCESS
             )
             return await ctx.send(embed=embed)
         
+        # Сохраняем игру
+        self.active_games[ctx.author.id] = {'bet': bet, 'game': game, 'guild_id': ctx.guild.id}
+        
         # Показываем карты
         embed = discord.Embed(
             title="🃏 БЛЭКДЖЕК",
-            description=f"**Твои карты:** {format_hand(player_hand)} = **{player_value}**\n"
-                       f"**Карта дилера:** {dealer_hand[0]['rank']}{dealer_hand[0]['suit']} 🎴\n\n"
+            description=f"**Твои карты:** {player.format()} = **{player.value}**\n"
+                       f"**Карта дилера:** {engine.CARD_LABELS[dealer.cards[0]]} 🎴\n\n"
                        f"Что делаешь?",
             color=Config.COLOR_INFO
         )
@@ -352,36 +266,21 @@ class Casino(commands.Cog):
     
     async def blackjack_hit(self, user_id, interaction):
         """Взять карту"""
-        game = self.active_games.get(user_id)
-        if not game:
+        state = self.active_games.get(user_id)
+        if not state:
             return
         
-        # Берем карту
-        card = game['deck'].pop()
-        game['player_hand'].append(card)
-        
-        def hand_value(hand):
-            value = sum(self.card_value_helper(card) for card in hand)
-            aces = sum(1 for card in hand if card['rank'] == 'A')
-            while value > 21 and aces:
-                value -= 10
-                aces -= 1
-            return value
-        
-        def format_hand(hand):
-            return ' '.join([f"{card['rank']}{card['suit']}" for card in hand])
-        
-        player_value = hand_value(game['player_hand'])
+        game, bet = state['game'], state['bet']
+        player_value = game.hit()
         
         # Перебор
-        if player_value > 21:
-            await db.add_coins(user_id, -game['bet'])
+        if game.finished:
             del self.active_games[user_id]
             
             embed = EmbedBuilder.error(
                 "🃏 ПЕРЕБОР!",
-                f"**Твои карты:** {format_hand(game['player_hand'])} = **{player_value}**\n\n"
-                f"💸 Потеряно: **{format_number(game['bet'])}** {Config.EMOJI_COIN}"
+                f"**Твои карты:** {game.player.format()} = **{player_value}**\n\n"
+                f"💸 Потеряно: **{format_number(bet)}** {Config.EMOJI_COIN}"
             )
             await interaction.response.edit_message(embed=embed, view=None)
             return
@@ -389,8 +288,8 @@ class Casino(commands.Cog):
         # Обновляем
         embed = discord.Embed(
             title="🃏 БЛЭКДЖЕК",
-            description=f"**Твои карты:** {format_hand(game['player_hand'])} = **{player_value}**\n"
-                       f"**Карта дилера:** {game['dealer_hand'][0]['rank']}{game['dealer_hand'][0]['suit']} 🎴",
+            description=f"**Твои карты:** {game.player.format()} = **{player_value}**\n"
+                       f"**Карта дилера:** {engine.CARD_LABELS[game.dealer.cards[0]]} 🎴",
             color=Config.COLOR_INFO
         )
         
@@ -399,68 +298,47 @@ class Casino(commands.Cog):
     
     async def blackjack_stand(self, user_id, interaction):
         """Остановиться"""
-        game = self.active_games.get(user_id)
-        if not game:
+        state = self.active_games.pop(user_id, None)
+        if not state:
             return
         
-        def hand_value(hand):
-            value = sum(self.card_value_helper(card) for card in hand)
-            aces = sum(1 for card in hand if card['rank'] == 'A')
-            while value > 21 and aces:
-                value -= 10
-                aces -= 1
-            return value
-        
-        def format_hand(hand):
-            return ' '.join([f"{card['rank']}{card['suit']}" for card in hand])
-        
-        # Дилер берет карты
-        while hand_value(game['dealer_hand']) < 17:
-            game['dealer_hand'].append(game['deck'].pop())
-        
-        player_value = hand_value(game['player_hand'])
-        dealer_value = hand_value(game['dealer_hand'])
+        # Дилер добирает карты, определяем победителя
+        game = state['game']
+        multiplier = game.stand()
+        winnings = engine.net_winnings(state['bet'], multiplier)
+        await self.pay_out(interaction.guild.id, user_id, state['bet'], multiplier, "blackjack")
         
-        # Определяем победителя
-        if dealer_value > 21 or player_value > dealer_value:
-            winnings = game['bet']
-            await db.add_coins(user_id, winnings)
+        if winnings > 0:
             result_text = "ПОБЕДА!"
             result_color = Config.COLOR_SUCCESS
             result_emoji = "🎉"
-        elif player_value == dealer_value:
-            winnings = 0
+        elif winnings == 0:
             result_text = "НИЧЬЯ"
             result_color = Config.COLOR_WARNING
             result_emoji = "🤝"
         else:
-            winnings = -game['bet']
-            await db.add_coins(user_id, winnings)
             result_text = "ПРОИГРЫШ"
             result_color = Config.COLOR_ERROR
             result_emoji = "😢"
         
-        del self.active_games[user_id]
-        
         embed = discord.Embed(
             title=f"🃏 {result_text} {result_emoji}",
-            description=f"**Твои карты:** {format_hand(game['player_hand'])} = **{player_value}**\n"
-                       f"**Карты дилера:** {format_hand(game['dealer_hand'])} = **{dealer_value}**\n\n"
+            description=f"**Твои карты:** {game.player.format()} = **{game.player.value}**\n"
+                       f"**Карты дилера:** {game.dealer.format()} = **{game.dealer.value}**\n\n"
                        f"{'💰 Выигрыш' if winnings > 0 else '💸 Потеряно' if winnings < 0 else '🤝 Возврат'}: "
                        f"**{format_number(abs(winnings))}** {Config.EMOJI_COIN}",
             color=result_color
         )
         
         await interaction.response.edit_message(embed=embed, view=None)
-    
-    def card_value_helper(self, card):
-        """Вспомогательная функция для значения карты"""
-        if card['rank'] in ['J', 'Q', 'K']:
-            return 10
-        elif card['rank'] == 'A':
-            return 11
-        else:
-            return int(card['rank'])
+
+    async def blackjack_timeout(self, user_id):
+        """Игрок не ответил вовремя: доигрываем как «остановиться», ставка уже списана"""
+        state = self.active_games.pop(user_id, None)
+        if not state:
+            return
+        game = state['game']
+        await self.pay_out(state['guild_id'], user_id, state['bet'], game.stand(), "blackjack")
 
 class BlackjackView(discord.ui.View):
     """Кнопки для блэкджека"""
@@ -475,6 +353,8 @@ class BlackjackView(discord.ui.View):
         if interaction.user.id != self.user_id:
             await interaction.response.send_message("Это не твоя игра!", ephemeral=True)
             return
+        # Кнопки этого сообщения заменены новым view - его таймаут больше не нужен
+        self.stop()
         await self.cog.blackjack_hit(self.user_id, interaction)
     
     @discord.ui.button(label="✋ Остановиться", style=discord.ButtonStyle.success)
@@ -482,7 +362,11 @@ class BlackjackView(discord.ui.View):
         if interaction.user.id != self.user_id:
             await interaction.response.send_message("Это не твоя игра!", ephemeral=True)
             return
+        self.stop()
         await self.cog.blackjack_stand(self.user_id, interaction)
+    
+    async def on_timeout(self):
+        await self.cog.blackjack_timeout(self.user_id)
 
 async def setup(bot):
     """Регистрация кога"""
@@ -2,8 +2,9 @@ import discord
 from discord.ext import commands
 import asyncio
 import random
-from database import db
-from utils import EmbedBuilder, Paginator, cooldown_manager, format_number, get_progress_bar
+from database import db, InsufficientFunds
+from leaderboards import leaderboards
+from utils import EmbedBuilder, Checks, Paginator, cooldown_manager, format_number, get_progress_bar
 from config import Config
 import logging
 
@@ -26,7 +27,7 @@ class Economy(commands.Cog):
         !balance @user - баланс другого пользователя
         """
         member = member or ctx.author
-        user_data = await db.get_user(member.id)
+        user_data = await db.get_user(ctx.guild.id, member.id)
         
         embed = discord.Embed(
             title=f"💰 Баланс {member.display_name}",
@@ -68,7 +69,7 @@ class Economy(commands.Cog):
         await ctx.send(embed=embed)
     
     @commands.command(name='daily', aliases=['ежедневно'])
-    @commands.cooldown(1, 86400, commands.BucketType.user)  # 1 раз в 24 часа
+    @Checks.persistent_cooldown('daily', 86400)  # 1 раз в 24 часа
     async def daily(self, ctx):
         """
         🎁 Получить ежедневную награду
@@ -80,7 +81,7 @@ class Economy(commands.Cog):
         reward = random.randint(100, 500)
         
         # Добавляем монеты
-        await db.add_coins(ctx.author.id, reward)
+        await db.add_coins(ctx.guild.id, ctx.author.id, reward, "daily")
         
         embed = EmbedBuilder.success(
             "🎁 Ежедневная награда получена!",
@@ -105,7 +106,7 @@ class Economy(commands.Cog):
             await ctx.send(embed=embed, delete_after=10)
     
     @commands.command(name='work', aliases=['работа'])
-    @commands.cooldown(1, 3600, commands.BucketType.user)  # 1 раз в час
+    @Checks.persistent_cooldown('work', 3600)  # 1 раз в час
     async def work(self, ctx):
         """
         💼 Поработать за монеты
@@ -127,7 +128,7 @@ class Economy(commands.Cog):
         job, emoji = random.choice(jobs)
         reward = random.randint(50, 150)
         
-        await db.add_coins(ctx.author.id, reward)
+        await db.add_coins(ctx.guild.id, ctx.author.id, reward, "work")
         
         embed = EmbedBuilder.success(
             f"{emoji} Ты поработал {job}",
@@ -173,7 +174,7 @@ class Economy(commands.Cog):
                 inline=False
             )
         
-        user_data = await db.get_user(ctx.author.id)
+        user_data = await db.get_user(ctx.guild.id, ctx.author.id)
         embed.set_footer(text=f"Твой баланс: {format_number(user_data['coins'])} монет")
         
         await ctx.send(embed=embed)
@@ -196,7 +197,7 @@ class Economy(commands.Cog):
             return await ctx.send(embed=embed, delete_after=10)
         
         item_data = Config.SHOP_ITEMS[item_id]
-        user_data = await db.get_user(ctx.author.id)
+        user_data = await db.get_user(ctx.guild.id, ctx.author.id)
         
         # Проверяем баланс
         if user_data['coins'] < item_data['price']:
@@ -208,10 +209,10 @@ class Economy(commands.Cog):
             return await ctx.send(embed=embed, delete_after=10)
         
         # Снимаем монеты
-        await db.add_coins(ctx.author.id, -item_data['price'])
+        await db.add_coins(ctx.guild.id, ctx.author.id, -item_data['price'], f"shop:{item_id}")
         
         # Добавляем предмет в инвентарь
-        await db.add_item(ctx.author.id, item_id, 1)
+        await db.add_item(ctx.guild.id, ctx.author.id, item_id, 1)
         
         embed = EmbedBuilder.success(
             "✅ Покупка успешна!",
@@ -233,7 +234,7 @@ class Economy(commands.Cog):
         !inventory @user - инвентарь другого игрока
         """
         member = member or ctx.author
-        inventory = await db.get_inventory(member.id)
+        inventory = await db.get_inventory(ctx.guild.id, member.id)
         
         if not inventory:
             embed = EmbedBuilder.info(
@@ -293,19 +294,18 @@ class Economy(commands.Cog):
             embed = EmbedBuilder.error("Ошибка", "Сумма должна быть больше 0!")
             return await ctx.send(embed=embed, delete_after=5)
         
-        # Проверяем баланс отправителя
-        sender_data = await db.get_user(ctx.author.id)
-        if sender_data['coins'] < amount:
-            needed = amount - sender_data['coins']
+        # Списание и зачисление одной транзакцией: баланс проверяется в самом UPDATE
+        try:
+            transferred = await db.transfer_coins(ctx.guild.id, ctx.author.id, member.id, amount, "give")
+        except InsufficientFunds as e:
             embed = EmbedBuilder.error(
                 "Недостаточно монет",
-                f"Нужно еще **{format_number(needed)}** {Config.EMOJI_COIN} монет"
+                f"Нужно еще **{format_number(e.needed)}** {Config.EMOJI_COIN} монет"
             )
             return await ctx.send(embed=embed, delete_after=10)
-        
-        # Переводим монеты
-        await db.add_coins(ctx.author.id, -amount)
-        await db.add_coins(member.id, amount)
+        if not transferred:
+            embed = EmbedBuilder.error("Ошибка", "Не удалось выполнить перевод, попробуй позже")
+            return await ctx.send(embed=embed, delete_after=10)
         
         embed = EmbedBuilder.success(
             "💸 Перевод успешен!",
@@ -323,11 +323,13 @@ class Economy(commands.Cog):
         
         Показывает 10 лучших игроков сервера
         """
-        top_users = await db.get_top_users(limit=10)
-        
+        embed = await leaderboards.get_embed("level", ctx.guild.id, "economy", self.render_leaderboard)
+        await ctx.send(embed=embed)
+    
+    def render_leaderboard(self, top_users) -> discord.Embed:
+        """Собирает embed топа игроков (кэшируется в leaderboards)"""
         if not top_users:
-            embed = EmbedBuilder.info("Топ игроков", "Пока никого нет в топе")
-            return await ctx.send(embed=embed)
+            return EmbedBuilder.info("Топ игроков", "Пока никого нет в топе")
         
         embed = discord.Embed(
             title="🏆 Топ игроков сервера",
@@ -354,7 +356,7 @@ class Economy(commands.Cog):
         
         embed.set_footer(text=f"Всего игроков: {len(top_users)}")
         
-        await ctx.send(embed=embed)
+        return embed
     
     @commands.command(name='coinflip', aliases=['cf', 'монетка'])
     @commands.cooldown(1, 10, commands.BucketType.user)
@@ -371,7 +373,7 @@ class Economy(commands.Cog):
             embed = EmbedBuilder.error("Ошибка", "Ставка должна быть больше 0!")
             return await ctx.send(embed=embed, delete_after=5)
         
-        user_data = await db.get_user(ctx.author.id)
+        user_data = await db.get_user(ctx.guild.id, ctx.author.id)
         
         if user_data['coins'] < bet:
             needed = bet - user_data['coins']
@@ -386,7 +388,7 @@ class Economy(commands.Cog):
         
         if result:
             # Выигрыш
-            await db.add_coins(ctx.author.id, bet)
+            await db.add_coins(ctx.guild.id, ctx.author.id, bet, "coinflip")
             embed = EmbedBuilder.success(
                 "🎉 Ты выиграл!",
                 f"Ставка: **{format_number(bet)}** {Config.EMOJI_COIN}\n"
@@ -394,7 +396,7 @@ class Economy(commands.Cog):
             )
         else:
             # Проигрыш
-            await db.add_coins(ctx.author.id, -bet)
+            await db.add_coins(ctx.guild.id, ctx.author.id, -bet, "coinflip")
             embed = EmbedBuilder.error(
                 "😢 Ты проиграл!",
                 f"Потеряно: **{format_number(bet)}** {Config.EMOJI_COIN}"
@@ -433,7 +433,7 @@ class Help(commands.Cog):
         )
         
         # Статус экономики
-        user_data = await db.get_user(member.id)
+        user_data = await db.get_user(ctx.guild.id, member.id)
         embed.add_field(
             name="💰 Экономика",
             value=f"Уровень: **{user_data['level']}**\n"
@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 from database import db
+from leaderboards import leaderboards
 from utils import EmbedBuilder, format_number
 from config import Config
 import logging
@@ -42,7 +43,7 @@ class Invites(commands.Cog):
                 if invite.uses > old_uses:
                     inviter = invite.inviter
                     # Обновляем счетчик
-                    await db.add_invites(inviter.id, 1)
+                    await db.add_invites(guild.id, inviter.id, 1)
                     break
             
             # Обновляем кэш
@@ -52,7 +53,7 @@ class Invites(commands.Cog):
                 logger.info(f"{member} приглашен пользователем {inviter}")
                 
                 # Награда за приглашение
-                await db.add_coins(inviter.id, 50)
+                await db.add_coins(guild.id, inviter.id, 50, "invite")
                 
         except Exception as e:
             logger.error(f"Ошибка отслеживания приглашения: {e}", exc_info=True)
@@ -67,7 +68,7 @@ class Invites(commands.Cog):
         !invites @user - приглашения пользователя
         """
         member = member or ctx.author
-        user_data = await db.get_user(member.id)
+        user_data = await db.get_user(ctx.guild.id, member.id)
         
         embed = discord.Embed(
             title=f"📨 Приглашения {member.display_name}",
@@ -92,15 +93,13 @@ class Invites(commands.Cog):
         
         Показывает топ-10 пользователей по количеству приглашений
         """
-        # Получаем всех пользователей с приглашениями
-        async with db.conn.execute(
-            "SELECT user_id, invites FROM users WHERE invites > 0 ORDER BY invites DESC LIMIT 10"
-        ) as cursor:
-            top_inviters = await cursor.fetchall()
-        
+        embed = await leaderboards.get_embed("invites", ctx.guild.id, "invites", self.render_leaderboard)
+        await ctx.send(embed=embed)
+    
+    def render_leaderboard(self, top_inviters) -> discord.Embed:
+        """Собирает embed топа приглашений (кэшируется в leaderboards)"""
         if not top_inviters:
-            embed = EmbedBuilder.info("Топ приглашений", "Пока никого нет")
-            return await ctx.send(embed=embed)
+            return EmbedBuilder.info("Топ приглашений", "Пока никого нет")
         
         embed = discord.Embed(
             title="🏆 Топ по приглашениям",
@@ -122,7 +121,7 @@ class Invites(commands.Cog):
                 inline=False
             )
         
-        await ctx.send(embed=embed)
+        return embed
 
 async def setup(bot):
     await bot.add_cog(Invites(bot))
@@ -2,7 +2,8 @@ import discord
 from discord.ext import commands
 from datetime import datetime, timedelta
 from database import db
-from utils import EmbedBuilder, Paginator, get_progress_bar, format_number, cooldown_manager
+from leaderboards import leaderboards
+from utils import EmbedBuilder, MessageInfo, Paginator, get_progress_bar, format_number, cooldown_manager
 from config import Config
 import logging
 import random
@@ -16,26 +17,28 @@ class Levels(commands.Cog):
         self.bot = bot
         logger.info("✅ Levels инициализирован")
     
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        """Начисляет XP за сообщения"""
-        # Игнорируем ботов и системные сообщения
-        if message.author.bot or not message.guild:
-            return
-        
-        # Игнорируем команды
-        ctx = await self.bot.get_context(message)
-        if ctx.valid:
-            return
+    async def cog_load(self):
+        self.bot.pipeline.register("reward", "levels", self.reward_message)
+    
+    async def cog_unload(self):
+        self.bot.pipeline.unregister("levels")
+    
+    async def reward_message(self, info: MessageInfo) -> bool:
+        """Стадия reward: начисляет XP за сообщения"""
+        # Команды опыт не дают
+        if info.is_command:
+            return False
         
+        message = info.message
         user_id = message.author.id
+        guild_id = message.guild.id
         
-        # Проверяем кулдаун
-        if cooldown_manager.is_on_cooldown(user_id, "xp_gain"):
-            return
+        # Проверяем кулдаун (опыт на каждом сервере свой, поэтому и кулдаун тоже)
+        if cooldown_manager.is_on_cooldown(user_id, "xp_gain", guild_id):
+            return False
         
         # Ставим кулдаун
-        cooldown_manager.set_cooldown(user_id, "xp_gain", Config.XP_COOLDOWN)
+        cooldown_manager.set_cooldown(user_id, "xp_gain", Config.XP_COOLDOWN, guild_id)
         
         # Начисляем XP
         xp_gain = Config.XP_PER_MESSAGE
@@ -44,25 +47,29 @@ class Levels(commands.Cog):
         if random.random() < 0.1:
             xp_gain *= 2
         
-        user_data = await db.get_user(user_id)
+        user_data = await db.get_user(guild_id, user_id)
         new_xp = user_data['xp'] + xp_gain
         current_level = user_data['level']
         
         # Проверяем повышение уровня
         new_level = Config.get_level_from_xp(new_xp)
         
-        await db.update_user(user_id, xp=new_xp, level=new_level)
+        # Копим XP в буфере, в БД он попадет пачкой при следующем сбросе
+        # (уровень там выводится из итогового XP, здесь он нужен только для поздравления)
+        db.queue_user_delta(guild_id, user_id, xp=xp_gain)
         
         # Если повысился уровень
         if new_level > current_level:
             await self.handle_level_up(message, message.author, new_level)
+        
+        return False
     
     async def handle_level_up(self, message: discord.Message, member: discord.Member, new_level: int):
         """Обрабатывает повышение уровня"""
         try:
             # Награда за уровень
             coin_reward = new_level * 50
-            await db.add_coins(member.id, coin_reward)
+            await db.add_coins(member.guild.id, member.id, coin_reward, "level_up", durable=False)
             
             embed = discord.Embed(
                 title="🎉 ПОВЫШЕНИЕ УРОВНЯ!",
@@ -126,15 +133,10 @@ class Levels(commands.Cog):
         !rank @user - ранг другого пользователя
         """
         member = member or ctx.author
-        user_data = await db.get_user(member.id)
+        user_data = await db.get_user(ctx.guild.id, member.id)
         
         # Получаем позицию в топе
-        top_users = await db.get_top_users(limit=1000)
-        position = None
-        for idx, user in enumerate(top_users, 1):
-            if user['user_id'] == member.id:
-                position = idx
-                break
+        position = await db.get_user_rank(ctx.guild.id, member.id)
         
         embed = discord.Embed(
             title=f"📊 Ранг {member.display_name}",
@@ -195,11 +197,13 @@ class Levels(commands.Cog):
         
         Показывает топ-10 игроков по уровню и опыту
         """
-        top_users = await db.get_top_users(limit=10)
-        
+        embed = await leaderboards.get_embed("level", ctx.guild.id, "levels", self.render_leaderboard)
+        await ctx.send(embed=embed)
+    
+    def render_leaderboard(self, top_users) -> discord.Embed:
+        """Собирает embed таблицы лидеров (кэшируется в leaderboards)"""
         if not top_users:
-            embed = EmbedBuilder.info("Таблица лидеров", "Пока никого нет в топе")
-            return await ctx.send(embed=embed)
+            return EmbedBuilder.info("Таблица лидеров", "Пока никого нет в топе")
         
         embed = discord.Embed(
             title="🏆 Таблица лидеров",
@@ -226,7 +230,7 @@ class Levels(commands.Cog):
         
         embed.set_footer(text=f"Всего игроков: {len(top_users)}")
         
-        await ctx.send(embed=embed)
+        return embed
     
     @commands.command(name='givexp', aliases=['дать-xp'])
     @commands.has_permissions(administrator=True)
@@ -243,12 +247,13 @@ class Levels(commands.Cog):
             embed = EmbedBuilder.error("Ошибка", "Количество XP должно быть положительным")
             return await ctx.send(embed=embed, delete_after=5)
         
-        user_data = await db.get_user(member.id)
+        user_data = await db.get_user(ctx.guild.id, member.id)
         old_level = user_data['level']
         new_xp = user_data['xp'] + amount
         new_level = Config.get_level_from_xp(new_xp)
         
-        await db.update_user(member.id, xp=new_xp, level=new_level)
+        await db.update_user(ctx.guild.id, member.id, xp=new_xp, level=new_level)
+        leaderboards.invalidate("level", ctx.guild.id)
         
         embed = EmbedBuilder.success(
             "XP выдан",
@@ -280,12 +285,13 @@ class Levels(commands.Cog):
             embed = EmbedBuilder.error("Ошибка", "Количество XP должно быть положительным")
             return await ctx.send(embed=embed, delete_after=5)
         
-        user_data = await db.get_user(member.id)
+        user_data = await db.get_user(ctx.guild.id, member.id)
         old_level = user_data['level']
         new_xp = max(0, user_data['xp'] - amount)
         new_level = Config.get_level_from_xp(new_xp)
         
-        await db.update_user(member.id, xp=new_xp, level=new_level)
+        await db.update_user(ctx.guild.id, member.id, xp=new_xp, level=new_level)
+        leaderboards.invalidate("level", ctx.guild.id)
         
         embed = EmbedBuilder.success(
             "XP забран",
@@ -318,9 +324,10 @@ class Levels(commands.Cog):
             return await ctx.send(embed=embed, delete_after=5)
         
         # Рассчитываем необходимый XP для этого уровня
-        xp_for_level = sum(Config.get_xp_for_level(l) for l in range(1, level + 1))
+        xp_for_level = Config.get_total_xp_for_level(level)
         
-        await db.update_user(member.id, xp=xp_for_level, level=level)
+        await db.update_user(ctx.guild.id, member.id, xp=xp_for_level, level=level)
+        leaderboards.invalidate("level", ctx.guild.id)
         
         embed = EmbedBuilder.success(
             "Уровень установлен",
@@ -353,7 +360,8 @@ class Levels(commands.Cog):
         if not confirmed:
             return
         
-        await db.update_user(member.id, xp=0, level=1)
+        await db.update_user(ctx.guild.id, member.id, xp=0, level=1)
+        leaderboards.invalidate("level", ctx.guild.id)
         
         embed = EmbedBuilder.success(
             "Уровень сброшен",
@@ -40,10 +40,10 @@ class Moderation(commands.Cog):
             return await ctx.send(embed=embed, delete_after=5)
         
         # Добавляем варн
-        await db.add_warn(member.id, ctx.author.id, reason)
+        await db.add_warn(ctx.guild.id, member.id, ctx.author.id, reason)
         
         # Получаем все варны пользователя
-        warns = await db.get_warns(member.id)
+        warns = await db.get_warns(ctx.guild.id, member.id)
         warn_count = len(warns)
         
         # Создаем embed
@@ -83,7 +83,7 @@ class Moderation(commands.Cog):
             pass  # У пользователя закрыты ЛС
         
         # Логируем в лог-канал
-        log_id = db.get_config("log_channel_id", cast_type=int)
+        log_id = db.get_config(ctx.guild.id, "log_channel_id", cast_type=int)
         if log_id:
             log_channel = ctx.guild.get_channel(log_id)
             if log_channel:
@@ -101,7 +101,7 @@ class Moderation(commands.Cog):
         !warns @user - варны другого пользователя
         """
         member = member or ctx.author
-        warns = await db.get_warns(member.id)
+        warns = await db.get_warns(ctx.guild.id, member.id)
         
         if not warns:
             embed = EmbedBuilder.success(
@@ -146,7 +146,7 @@ class Moderation(commands.Cog):
         
         Требуемые права: Administrator
         """
-        warns = await db.get_warns(member.id)
+        warns = await db.get_warns(ctx.guild.id, member.id)
         
         if not warns:
             embed = EmbedBuilder.info("Нет предупреждений", f"{member.mention} не имеет варнов")
@@ -163,7 +163,7 @@ class Moderation(commands.Cog):
             return
         
         # Очищаем варны
-        await db.clear_warns(member.id)
+        await db.clear_warns(ctx.guild.id, member.id)
         
         embed = EmbedBuilder.success(
             "✅ Варны очищены",
@@ -233,7 +233,7 @@ class Moderation(commands.Cog):
         await ctx.send(embed=embed)
         
         # Логируем
-        log_id = db.get_config("log_channel_id", cast_type=int)
+        log_id = db.get_config(ctx.guild.id, "log_channel_id", cast_type=int)
         if log_id:
             log_channel = ctx.guild.get_channel(log_id)
             if log_channel:
@@ -301,7 +301,7 @@ class Moderation(commands.Cog):
         await ctx.send(embed=embed)
         
         # Логируем
-        log_id = db.get_config("log_channel_id", cast_type=int)
+        log_id = db.get_config(ctx.guild.id, "log_channel_id", cast_type=int)
         if log_id:
             log_channel = ctx.guild.get_channel(log_id)
             if log_channel:
@@ -63,7 +63,7 @@ class RandomEvents(commands.Cog):
         
         try:
             msg = await self.bot.wait_for('message', check=check, timeout=60)
-            await db.add_coins(msg.author.id, amount)
+            await db.add_coins(channel.guild.id, msg.author.id, amount, "event:airdrop")
             
             embed = EmbedBuilder.success(
                 "Поздравляем!",
@@ -81,8 +81,8 @@ class RandomEvents(commands.Cog):
         
         online_members = [m for m in channel.guild.members if m.status != discord.Status.offline and not m.bot]
         
-        for member in online_members:
-            await db.add_xp(member.id, bonus_xp)
+        # Одна транзакция на всех вместо отдельного коммита на каждого
+        await db.bulk_add_xp(channel.guild.id, [(member.id, bonus_xp) for member in online_members])
         
         embed = discord.Embed(
             title="⭐ БОНУС XP!",
@@ -105,8 +105,7 @@ class RandomEvents(commands.Cog):
         
         per_person = total_amount // len(active_members)
         
-        for member in active_members:
-            await db.add_coins(member.id, per_person)
+        await db.bulk_add_coins(channel.guild.id, [(member.id, per_person) for member in active_members], "event:rain")
         
         embed = discord.Embed(
             title="🌧️ ДОЖДЬ МОНЕТ!",
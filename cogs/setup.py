@@ -50,7 +50,7 @@ class Setup(commands.Cog):
                 )
                 logger.info(f"Создана категория тикетов: {ticket_category.id}")
             
-            await db.set_config("ticket_category_id", ticket_category.id)
+            await db.set_config(guild.id, "ticket_category_id", ticket_category.id)
             
             # --- КАТЕГОРИЯ ДЛЯ ГОЛОСОВЫХ КАНАЛОВ ---
             voice_category = discord.utils.get(guild.categories, name=Config.VOICE_CATEGORY_NAME)
@@ -61,7 +61,7 @@ class Setup(commands.Cog):
                 )
                 logger.info(f"Создана категория войсов: {voice_category.id}")
             
-            await db.set_config("voice_category_id", voice_category.id)
+            await db.set_config(guild.id, "voice_category_id", voice_category.id)
             
             # --- КАНАЛ-ТРИГГЕР ДЛЯ СОЗДАНИЯ ВОЙСОВ ---
             trigger_channel = discord.utils.get(voice_category.voice_channels, name="➕ Создать комнату")
@@ -73,7 +73,7 @@ class Setup(commands.Cog):
                 )
                 logger.info(f"Создан канал-триггер: {trigger_channel.id}")
             
-            await db.set_config("voice_trigger_id", trigger_channel.id)
+            await db.set_config(guild.id, "voice_trigger_id", trigger_channel.id)
             
             # --- КАНАЛ ДЛЯ ЛОГОВ ---
             log_channel = discord.utils.get(guild.text_channels, name="📝-логи")
@@ -94,7 +94,7 @@ class Setup(commands.Cog):
                 )
                 logger.info(f"Создан канал логов: {log_channel.id}")
             
-            await db.set_config("log_channel_id", log_channel.id)
+            await db.set_config(guild.id, "log_channel_id", log_channel.id)
             
             # --- КАНАЛ ПРИВЕТСТВИЙ ---
             welcome_channel = discord.utils.get(guild.text_channels, name="👋-приветствия")
@@ -105,7 +105,7 @@ class Setup(commands.Cog):
                 )
                 logger.info(f"Создан канал приветствий: {welcome_channel.id}")
             
-            await db.set_config("welcome_channel_id", welcome_channel.id)
+            await db.set_config(guild.id, "welcome_channel_id", welcome_channel.id)
             
             # --- УСПЕШНОЕ ЗАВЕРШЕНИЕ ---
             embed = discord.Embed(
@@ -185,7 +185,7 @@ class Setup(commands.Cog):
         }
         
         for key, label in configs.items():
-            channel_id = db.get_config(key, cast_type=int)
+            channel_id = db.get_config(ctx.guild.id, key, cast_type=int)
             
             if channel_id:
                 channel = guild.get_channel(channel_id)
@@ -230,7 +230,7 @@ class Setup(commands.Cog):
         
         Требуемые права: Administrator
         """
-        await db.set_config("log_channel_id", channel.id)
+        await db.set_config(ctx.guild.id, "log_channel_id", channel.id)
         
         embed = EmbedBuilder.success(
             "📝 Канал логов установлен",
@@ -251,7 +251,7 @@ class Setup(commands.Cog):
         
         Требуемые права: Administrator
         """
-        await db.set_config("welcome_channel_id", channel.id)
+        await db.set_config(ctx.guild.id, "welcome_channel_id", channel.id)
         
         embed = EmbedBuilder.success(
             "👋 Канал приветствий установлен",
@@ -293,7 +293,7 @@ class Setup(commands.Cog):
         ]
         
         for key in configs_to_delete:
-            await db.delete_config(key)
+            await db.delete_config(ctx.guild.id, key)
         
         embed = EmbedBuilder.success(
             "✅ Конфигурация сброшена",
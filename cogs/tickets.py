@@ -23,7 +23,7 @@ class TicketLauncher(discord.ui.View):
         member = interaction.user
         
         # Проверяем, нет ли уже открытого тикета
-        category_id = db.get_config("ticket_category_id", cast_type=int)
+        category_id = db.get_config(guild.id, "ticket_category_id", cast_type=int)
         if category_id:
             category = guild.get_channel(category_id)
             if category:
@@ -112,7 +112,7 @@ class TicketLauncher(discord.ui.View):
             await interaction.followup.send(embed=success_embed, ephemeral=True)
             
             # Логируем в канал логов
-            log_id = db.get_config("log_channel_id", cast_type=int)
+            log_id = db.get_config(guild.id, "log_channel_id", cast_type=int)
             if log_id:
                 log_channel = guild.get_channel(log_id)
                 if log_channel:
@@ -197,7 +197,7 @@ class TicketControls(discord.ui.View):
                 f.write("\n".join(transcript))
             
             # Отправляем в логи
-            log_id = db.get_config("log_channel_id", cast_type=int)
+            log_id = db.get_config(interaction.guild.id, "log_channel_id", cast_type=int)
             if log_id:
                 log_channel = interaction.guild.get_channel(log_id)
                 if log_channel:
@@ -309,7 +309,7 @@ class Tickets(commands.Cog):
         channel = ctx.channel
         
         # Проверяем, что это тикет
-        category_id = db.get_config("ticket_category_id", cast_type=int)
+        category_id = db.get_config(ctx.guild.id, "ticket_category_id", cast_type=int)
         if not category_id or channel.category_id != category_id:
             embed = EmbedBuilder.error("Ошибка", "Эта команда работает только в тикетах")
             return await ctx.send(embed=embed, delete_after=5)
@@ -347,7 +347,7 @@ class Tickets(commands.Cog):
         channel = ctx.channel
         
         # Проверяем, что это тикет
-        category_id = db.get_config("ticket_category_id", cast_type=int)
+        category_id = db.get_config(ctx.guild.id, "ticket_category_id", cast_type=int)
         if not category_id or channel.category_id != category_id:
             embed = EmbedBuilder.error("Ошибка", "Эта команда работает только в тикетах")
             return await ctx.send(embed=embed, delete_after=5)
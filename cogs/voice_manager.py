@@ -20,8 +20,8 @@ class VoiceManager(commands.Cog):
         """Обрабатывает подключения/отключения от голосовых каналов"""
         try:
             # Получаем настройки из БД
-            trigger_id = db.get_config("voice_trigger_id", cast_type=int)
-            category_id = db.get_config("voice_category_id", cast_type=int)
+            trigger_id = db.get_config(member.guild.id, "voice_trigger_id", cast_type=int)
+            category_id = db.get_config(member.guild.id, "voice_category_id", cast_type=int)
             
             # Если система не настроена - выходим
             if not trigger_id or not category_id:
@@ -22,7 +22,7 @@ class Welcome(commands.Cog):
             guild = member.guild
             
             # Получаем канал приветствий из БД
-            channel_id = db.get_config("welcome_channel_id", cast_type=int)
+            channel_id = db.get_config(guild.id, "welcome_channel_id", cast_type=int)
             
             if not channel_id:
                 logger.debug(f"Канал приветствий не настроен для {guild.name}")
@@ -72,7 +72,7 @@ class Welcome(commands.Cog):
             )
             
             # Даем начальные монеты новичку
-            await db.add_coins(member.id, 100)
+            await db.add_coins(guild.id, member.id, 100, "welcome", durable=False)
             
             logger.info(f"Приветствован новый участник: {member} ({member.id}) на {guild.name}")
             
@@ -86,7 +86,7 @@ class Welcome(commands.Cog):
             guild = member.guild
             
             # Получаем канал приветствий
-            channel_id = db.get_config("welcome_channel_id", cast_type=int)
+            channel_id = db.get_config(guild.id, "welcome_channel_id", cast_type=int)
             
             if not channel_id:
                 return
@@ -124,7 +124,7 @@ class Welcome(commands.Cog):
         
         Требуемые права: Administrator
         """
-        channel_id = db.get_config("welcome_channel_id", cast_type=int)
+        channel_id = db.get_config(ctx.guild.id, "welcome_channel_id", cast_type=int)
         
         if not channel_id:
             embed = EmbedBuilder.error(
@@ -195,7 +195,7 @@ class Welcome(commands.Cog):
         
         Требуемые права: Administrator
         """
-        channel_id = db.get_config("welcome_channel_id", cast_type=int)
+        channel_id = db.get_config(ctx.guild.id, "welcome_channel_id", cast_type=int)
         
         embed = discord.Embed(
             title="📝 Настройки приветствий",
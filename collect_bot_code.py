@@ -17,7 +17,7 @@ CATEGORIES = {
     'CORE': {
         'name': '1_BOT_CORE',
         'description': 'Основные файлы бота',
-        'files': ['main.py', 'database.py', 'config.py', 'utils.py'],
+        'files': ['main.py', 'database.py', 'config.py', 'utils.py', 'leaderboards.py', 'migrations.py', 'word_filter.py', 'casino_engine.py', 'casino_simulator.py'],
         'folders': []
     },
     'COGS_1': {
@@ -1,3 +1,4 @@
+import math
 import os
 from dotenv import load_dotenv
 from typing import Optional
@@ -23,6 +24,14 @@ class Config:
     except ValueError:
         print("⚠️ [Config] OWNER_ID должен быть числом")
     
+    # Сервер, которому при миграции достаются данные, записанные до разделения по серверам.
+    # Обязателен для БД старого формата (см. .env.example), иначе миграция остановит запуск
+    PRIMARY_GUILD_ID: int = 0
+    try:
+        PRIMARY_GUILD_ID = int(os.getenv("PRIMARY_GUILD_ID") or 0)
+    except ValueError:
+        print("⚠️ [Config] PRIMARY_GUILD_ID должен быть числом")
+    
     # Настройки экономики
     XP_PER_MESSAGE: int = 5
     XP_COOLDOWN: int = 60  # Секунд между начислением XP
@@ -31,6 +40,52 @@ class Config:
     # Настройки уровней (формула: XP = базовое * уровень)
     XP_BASE: int = 100
     
+    # Настройки базы данных
+    DB_FLUSH_INTERVAL: float = 5.0  # Секунд между сбросом накопленного XP/монет в БД
+    DB_FLUSH_MAX_PENDING: int = 500  # Досрочный сброс, если накопилось столько пользователей
+    BALANCE_SNAPSHOT_INTERVAL: int = 3600  # Секунд между снимками балансов для журнала транзакций
+    COOLDOWN_PURGE_INTERVAL: int = 600  # Секунд между очистками истекших кулдаунов (БД и кэш)
+    DB_COMMIT_WINDOW: float = 0.005  # Секунд, за которые очередь записи собирает пачку до commit
+    DB_COMMIT_MAX_BATCH: int = 200   # Операций в одной транзакции очереди записи
+    DB_QUERY_SAMPLES: int = 1000     # Последних замеров на метод для перцентилей !dbstats
+    # Запросы дольше порога (мс) пишутся в лог вместе с EXPLAIN QUERY PLAN
+    DB_SLOW_QUERY_MS: float = 100.0
+    try:
+        DB_SLOW_QUERY_MS = float(os.getenv("DB_SLOW_QUERY_MS") or DB_SLOW_QUERY_MS)
+    except ValueError:
+        print("⚠️ [Config] DB_SLOW_QUERY_MS должен быть числом")
+    
+    # Кэш таблиц лидеров
+    LEADERBOARD_SIZE: int = 10  # Сколько мест хранить в каждой таблице
+    LEADERBOARD_TTL: int = 30   # Не чаще раза в N секунд перечитывать изменившийся топ
+    
+    # Кэш строк пользователей (get_user)
+    USER_CACHE_SIZE: int = 10000  # Максимум пользователей в кэше
+    USER_CACHE_TTL: int = 300     # Секунд жизни записи
+    
+    # Профиль хранилища SQLite (ключ из DB_STORAGE_PROFILES)
+    DB_STORAGE_PROFILE: str = os.getenv("DB_STORAGE_PROFILE", "wal")
+    DB_STORAGE_PROFILES = {
+        # WAL: читатели не ждут писателя, fsync только на чекпоинтах
+        "wal": {
+            "journal_mode": "WAL",
+            "synchronous": "NORMAL",
+            "mmap_size": 256 * 1024 * 1024,  # 256 МБ
+            "cache_size": -64 * 1024,        # 64 МБ (отрицательное значение = КБ)
+            "busy_timeout": 5000,            # мс
+            "read_pool_size": 4              # Соединений только для чтения
+        },
+        # Классический журнал отката, максимальная надежность
+        "safe": {
+            "journal_mode": "DELETE",
+            "synchronous": "FULL",
+            "mmap_size": 0,
+            "cache_size": -2000,
+            "busy_timeout": 5000,
+            "read_pool_size": 0
+        }
+    }
+    
     # Цвета для embed сообщений
     COLOR_SUCCESS: int = 0x2ECC71  # Зеленый
     COLOR_ERROR: int = 0xE74C3C    # Красный
@@ -86,7 +141,7 @@ class Config:
         """Проверяет, что все необходимые настройки заданы"""
         if not cls.TOKEN:
             print("❌ [Config] DISCORD_TOKEN не найден в переменных окружения!")
-            print("💡 Создайте файл .env и добавьте: DISCORD_TOKEN=ваш_токен")
+            print("💡 Создайте файл .env по образцу .env.example и добавьте: DISCORD_TOKEN=ваш_токен")
             return False
         
         if len(cls.TOKEN) < 50:
@@ -101,17 +156,25 @@ class Config:
         """Вычисляет необходимый XP для достижения уровня"""
         return cls.XP_BASE * level
     
+    @classmethod
+    def get_total_xp_for_level(cls, level: int) -> int:
+        """Суммарный XP, с которого начинается уровень (XP_BASE * (1 + 2 + ... + (level - 1)))"""
+        if level <= 1:
+            return 0
+        return cls.XP_BASE * level * (level - 1) // 2
+    
     @classmethod
     def get_level_from_xp(cls, xp: int) -> int:
-        """Вычисляет уровень по количеству XP"""
-        level = 1
-        total_xp = 0
-        while total_xp <= xp:
-            total_xp += cls.get_xp_for_level(level)
-            if total_xp > xp:
-                break
-            level += 1
-        return level
+        """
+        Вычисляет уровень по количеству XP за O(1).
+        Уровень L - максимальный, для которого XP_BASE * L(L-1)/2 <= xp,
+        т.е. k = L - 1 - максимальное целое с k(k+1)/2 <= xp // XP_BASE.
+        При изменении формулы get_xp_for_level эти две функции нужно обновить.
+        """
+        if xp <= 0:
+            return 1
+        n = xp // cls.XP_BASE
+        return (math.isqrt(8 * n + 1) - 1) // 2 + 1
 
 # Проверяем конфигурацию при импорте
 if __name__ != "__main__":
@@ -1,113 +1,831 @@
 import aiosqlite
-import json
+import asyncio
+import logging
+import math
 import os
-from typing import Optional, Dict, Any, List
+import sys
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional, Dict, Any, List
+from config import Config
+import migrations
 
 DB_NAME = "database.db"
 
+logger = logging.getLogger('DiscordBot.Database')
+
+class InsufficientFunds(Exception):
+    """Списание отклонено: монет на балансе меньше, чем нужно"""
+
+    def __init__(self, balance: int, amount: int):
+        super().__init__(f"Баланс {balance} меньше {amount}")
+        self.balance = balance
+        self.amount = amount
+        self.needed = amount - balance
+
+class UserCache:
+    """LRU-кэш строк таблицы users с ограничением по размеру и времени жизни"""
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._rows: "OrderedDict[tuple, tuple]" = OrderedDict()  # (guild_id, user_id) -> (expires_at, row)
+        # Идущие загрузки из БД: (guild_id, user_id) -> [кол-во загрузок, была ли запись за это время]
+        self._loading: Dict[tuple, list] = {}
+
+    def get(self, key: tuple) -> Optional[Dict[str, Any]]:
+        """Возвращает копию строки или None (промах)"""
+        item = self._rows.get(key)
+        if item is None:
+            self.misses += 1
+            return None
+        expires_at, row = item
+        if expires_at < time.monotonic():
+            del self._rows[key]
+            self.misses += 1
+            return None
+        self._rows.move_to_end(key)
+        self.hits += 1
+        return dict(row)
+
+    def begin_load(self, key: tuple):
+        """Отмечает начало чтения строки из БД"""
+        state = self._loading.get(key)
+        if state is None:
+            state = self._loading[key] = [0, False]
+        state[0] += 1
+
+    def end_load(self, key: tuple, row: Optional[Dict[str, Any]]):
+        """Кладет прочитанную строку в кэш, если ее не изменили во время чтения"""
+        state = self._loading.get(key)
+        if state is None:
+            return
+        state[0] -= 1
+        if state[0] <= 0:
+            del self._loading[key]
+        if row is not None and not state[1]:
+            self._put(key, row)
+
+    def _put(self, key: tuple, row: Dict[str, Any]):
+        self._rows[key] = (time.monotonic() + self.ttl, dict(row))
+        self._rows.move_to_end(key)
+        while len(self._rows) > self.max_size:
+            self._rows.popitem(last=False)
+
+    def _touch(self, key: tuple):
+        state = self._loading.get(key)
+        if state is not None:
+            state[1] = True
+
+    def update(self, key: tuple, **fields):
+        """Записывает новые абсолютные значения полей"""
+        self._touch(key)
+        item = self._rows.get(key)
+        if item is not None:
+            item[1].update(fields)
+
+    def apply_delta(self, key: tuple, column: str, amount: int):
+        """Повторяет в кэше атомарный инкремент MAX(0, col + amount)"""
+        self._touch(key)
+        item = self._rows.get(key)
+        if item is not None:
+            row = item[1]
+            row[column] = max(0, row[column] + amount)
+
+    def sync_level(self, key: tuple):
+        """Повторяет в кэше level = MAX(level, xp_level(xp)) из сброса дельт"""
+        self._touch(key)
+        item = self._rows.get(key)
+        if item is not None:
+            row = item[1]
+            row["level"] = max(row["level"], Config.get_level_from_xp(row["xp"]))
+
+    def invalidate(self, key: tuple):
+        """Удаляет строку из кэша"""
+        self._touch(key)
+        self._rows.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Счетчики попаданий/промахов для подбора размера кэша"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._rows),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+class QueryStats:
+    """
+    Замеры запросов по методам Database: число вызовов, время execute и возвращенные строки.
+    Медленные запросы пишутся в лог вместе с планом (EXPLAIN QUERY PLAN).
+    """
+
+    # Операторы, для которых SQLite умеет показать план
+    EXPLAINABLE = ("SELECT", "INSERT", "UPDATE", "DELETE", "REPLACE", "WITH")
+    # Управление транзакцией: в статистику запросов не идет, commit пачки считается отдельно
+    CONTROL = ("BEGIN", "SAVEPOINT", "RELEASE", "COMMIT", "ROLLBACK", "END")
+    # Имя метрики для commit пачки очереди записи
+    COMMIT = "WriteQueue.commit"
+
+    def __init__(self, samples: int, slow_ms: float):
+        self.samples = samples
+        self.slow_ms = slow_ms
+        # метод -> [вызовов, суммарное время, строк, последние замеры времени]
+        self.methods: Dict[str, list] = {}
+        self.slow_queries = 0
+        # SQL -> план, чтобы повторяющийся медленный запрос не объяснялся каждый раз
+        self._plans: Dict[str, str] = {}
+
+    def record(self, method: str, elapsed: float, rows: int = 0):
+        stat = self.methods.get(method)
+        if stat is None:
+            stat = self.methods[method] = [0, 0.0, 0, deque(maxlen=self.samples)]
+        stat[0] += 1
+        stat[1] += elapsed
+        stat[2] += rows
+        stat[3].append(elapsed)
+
+    @classmethod
+    def is_control(cls, query: str) -> bool:
+        return query.lstrip()[:9].upper().startswith(cls.CONTROL)
+
+    def add_rows(self, method: str, rows: int):
+        """Досчитывает строки, прочитанные из курсора после execute"""
+        stat = self.methods.get(method)
+        if stat is not None:
+            stat[2] += rows
+
+    async def log_slow(self, conn: aiosqlite.Connection, method: str, elapsed: float, query: str, params):
+        """Пишет медленный запрос и его план в лог"""
+        self.slow_queries += 1
+        sql = " ".join(query.split())
+        plan = self._plans.get(sql)
+        if plan is None and sql.upper().startswith(self.EXPLAINABLE):
+            try:
+                async with conn.execute(f"EXPLAIN QUERY PLAN {query}", params) as cursor:
+                    plan = "\n".join(f"    {row[3]}" for row in await cursor.fetchall())
+            except Exception as e:
+                plan = f"    (план недоступен: {e})"
+            self._plans[sql] = plan
+        logger.warning(
+            f"🐢 Медленный запрос в {method}: {elapsed * 1000:.1f} мс\n  {sql[:500]}"
+            + (f"\n{plan}" if plan else "")
+        )
+
+    @staticmethod
+    def _percentile(ordered: List[float], p: float) -> float:
+        index = min(len(ordered) - 1, max(0, math.ceil(p * len(ordered)) - 1))
+        return ordered[index]
+
+    def stats(self) -> List[Dict[str, Any]]:
+        """Статистика по методам, самые затратные по суммарному времени - первыми"""
+        result = []
+        for method, (calls, total, rows, samples) in self.methods.items():
+            ordered = sorted(samples)
+            result.append({
+                "method": method,
+                "calls": calls,
+                "rows": rows,
+                "total_ms": total * 1000,
+                "p50_ms": self._percentile(ordered, 0.50) * 1000,
+                "p95_ms": self._percentile(ordered, 0.95) * 1000,
+                "p99_ms": self._percentile(ordered, 0.99) * 1000
+            })
+        result.sort(key=lambda item: item["total_ms"], reverse=True)
+        return result
+
+    def reset(self):
+        self.methods.clear()
+        self.slow_queries = 0
+
+class _TimedQuery:
+    """Результат InstrumentedConnection.execute: работает и через await, и через async with"""
+
+    __slots__ = ("_owner", "_method", "_query", "_params", "_many", "_cursor")
+
+    def __init__(self, owner: "InstrumentedConnection", method: str, query: str, params, many: bool):
+        self._owner = owner
+        self._method = method
+        self._query = query
+        self._params = params
+        self._many = many
+        self._cursor = None
+
+    async def _run(self) -> "_CountingCursor":
+        conn, stats = self._owner.conn, self._owner.stats
+        started = time.perf_counter()
+        if self._many:
+            cursor = await conn.executemany(self._query, self._params)
+        else:
+            cursor = await conn.execute(self._query, self._params)
+        elapsed = time.perf_counter() - started
+        if QueryStats.is_control(self._query):
+            self._cursor = _CountingCursor(cursor, stats, self._method)
+            return self._cursor
+        # Для изменяющих запросов строки - rowcount, для SELECT досчитываются при чтении
+        stats.record(self._method, elapsed, max(cursor.rowcount, 0))
+        if elapsed * 1000 >= stats.slow_ms:
+            params = self._params
+            if self._many:
+                params = next(iter(params), ()) if isinstance(params, (list, tuple)) else ()
+            await stats.log_slow(conn, self._method, elapsed, self._query, params)
+        self._cursor = _CountingCursor(cursor, stats, self._method)
+        return self._cursor
+
+    def __await__(self):
+        return self._run().__await__()
+
+    async def __aenter__(self) -> "_CountingCursor":
+        return await self._run()
+
+    async def __aexit__(self, *exc):
+        if self._cursor is not None:
+            await self._cursor.close()
+
+class _CountingCursor:
+    """Курсор, который считает прочитанные строки в QueryStats"""
+
+    __slots__ = ("_cursor", "_stats", "_method")
+
+    def __init__(self, cursor: aiosqlite.Cursor, stats: QueryStats, method: str):
+        self._cursor = cursor
+        self._stats = stats
+        self._method = method
+
+    async def fetchone(self):
+        row = await self._cursor.fetchone()
+        if row is not None:
+            self._stats.add_rows(self._method, 1)
+        return row
+
+    async def fetchall(self):
+        rows = await self._cursor.fetchall()
+        self._stats.add_rows(self._method, len(rows))
+        return rows
+
+    async def fetchmany(self, size: int = None):
+        rows = await (self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany())
+        self._stats.add_rows(self._method, len(rows))
+        return rows
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class InstrumentedConnection:
+    """
+    Обертка над aiosqlite.Connection: execute/executemany замеряются в QueryStats
+    под именем вызвавшего метода Database (или функции миграции). Остальное - как у соединения.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, stats: QueryStats, method: str = None):
+        self.conn = conn
+        self.stats = stats
+        # Имя по умолчанию для всех запросов через эту обертку (см. labeled)
+        self.method = method
+
+    @staticmethod
+    def caller_name(depth: int = 1) -> str:
+        """Имя функции, которая depth кадрами выше вызвала caller_name: Database.update_user.<locals>.op -> update_user"""
+        code = sys._getframe(depth + 1).f_code
+        # co_qualname есть только с Python 3.11; до него у замыканий будет просто "op",
+        # поэтому операции очереди записи подписываются явно через labeled()
+        name = getattr(code, "co_qualname", code.co_name)
+        name = name.split(".<locals>", 1)[0]
+        return name[len("Database."):] if name.startswith("Database.") else name
+
+    def labeled(self, method: str) -> "InstrumentedConnection":
+        """То же соединение, но запросы без явного method числятся за method"""
+        return InstrumentedConnection(self.conn, self.stats, method)
+
+    def execute(self, query: str, params=(), method: str = None) -> _TimedQuery:
+        return _TimedQuery(self, method or self.method or self.caller_name(1), query, params, many=False)
+
+    def executemany(self, query: str, params, method: str = None) -> _TimedQuery:
+        return _TimedQuery(self, method or self.method or self.caller_name(1), query, params, many=True)
+
+    def __getattr__(self, name):
+        return getattr(self.conn, name)
+
+class WriteQueue:
+    """
+    Group commit для единственного соединения на запись.
+    Операции копятся в очереди, фоновая задача применяет их пачкой в одной транзакции
+    (каждую в своем SAVEPOINT, чтобы ошибка одной не откатывала остальные) и делает один commit.
+    """
+
+    def __init__(self, window: float, max_batch: int,
+                 flush: Callable[[aiosqlite.Connection], Awaitable[None]] = None,
+                 on_commit: Callable[[], None] = None, on_rollback: Callable[[], None] = None,
+                 query_stats: QueryStats = None):
+        self.window = window
+        self.max_batch = max_batch
+        # Время commit пачек пишется в QueryStats отдельной метрикой (QueryStats.COMMIT)
+        self.query_stats = query_stats
+        # Хуки владельца: flush пишет буферы write-behind в открытую транзакцию,
+        # on_commit / on_rollback вызываются после commit / отката пачки
+        self._flush = flush
+        self._on_commit = on_commit
+        self._on_rollback = on_rollback
+        self.conn: Optional[aiosqlite.Connection] = None
+        # (операция, future или None, нужен ли flush перед ней, колбэк после commit)
+        self._pending: deque = deque()
+        # События создаются в start(): до Python 3.10 Event привязывается к циклу при создании,
+        # а очередь создается при импорте модуля, до asyncio.run
+        self._wakeup: Optional[asyncio.Event] = None
+        self._idle: Optional[asyncio.Event] = None
+        self._closing = False
+        self._task = None
+        # Нечетное generation - транзакция пачки открыта; читатели сверяют его до и после чтения
+        self.generation = 0
+        # Метрики
+        self.batches = 0
+        self.operations = 0
+        self.failed = 0
+        self.max_depth = 0
+        self.last_commit = 0.0
+        self.total_commit = 0.0
+        self.max_commit = 0.0
+
+    def start(self, conn: aiosqlite.Connection):
+        self.conn = conn
+        self._closing = False
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Дописывает все, что осталось в очереди, и останавливает задачу"""
+        if self._task is None:
+            return
+        self._closing = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def submit(self, op: Callable[[aiosqlite.Connection], Awaitable[Any]], durable: bool = True,
+               flush: bool = False, on_commit: Callable[[Any], None] = None) -> Optional[asyncio.Future]:
+        """
+        Ставит операцию в очередь. op(conn) выполняется внутри транзакции пачки.
+        С durable=True возвращает future с результатом op, который завершается после commit;
+        иначе None, а ошибка только пишется в лог.
+        """
+        if self._task is None or self._closing:
+            raise RuntimeError("Очередь записи не запущена")
+        future = asyncio.get_running_loop().create_future() if durable else None
+        self._pending.append((op, future, flush, on_commit))
+        self.max_depth = max(self.max_depth, len(self._pending))
+        self._wakeup.set()
+        return future
+
+    async def _run(self):
+        while True:
+            if self._closing and not self._pending:
+                return
+            await self._wakeup.wait()
+            # Ждем окно, чтобы в пачку попали соседние записи (если пачка еще не набралась)
+            if not self._closing and len(self._pending) < self.max_batch:
+                await asyncio.sleep(self.window)
+            self._wakeup.clear()
+            if not self._pending:
+                continue
+            batch = [self._pending.popleft() for _ in range(min(len(self._pending), self.max_batch))]
+            if self._pending:
+                self._wakeup.set()
+            self.generation += 1
+            self._idle.clear()
+            try:
+                await self._commit(batch)
+            finally:
+                self.generation += 1
+                self._idle.set()
+
+    async def wait_idle(self):
+        """Ждет, пока текущая пачка не будет зафиксирована или откатана (вместе с хуками)"""
+        if self._idle is not None:
+            await self._idle.wait()
+
+    async def _commit(self, batch: List[tuple]):
+        conn = self.conn
+        results = []
+        try:
+            await conn.execute("BEGIN")
+            if self._flush:
+                await self._flush(conn)
+            for op, _, flush, _ in batch:
+                if flush and self._flush:
+                    await self._flush(conn)
+                await conn.execute("SAVEPOINT write_op")
+                try:
+                    result = await op(conn)
+                except Exception as e:
+                    await conn.execute("ROLLBACK TO write_op")
+                    await conn.execute("RELEASE write_op")
+                    results.append((False, e))
+                    continue
+                await conn.execute("RELEASE write_op")
+                results.append((True, result))
+            started = time.perf_counter()
+            await conn.commit()
+            elapsed = time.perf_counter() - started
+            if self.query_stats:
+                self.query_stats.record(QueryStats.COMMIT, elapsed)
+                if elapsed * 1000 >= self.query_stats.slow_ms:
+                    await self.query_stats.log_slow(conn, QueryStats.COMMIT, elapsed, "COMMIT", ())
+        except Exception as e:
+            print(f"❌ [Database] Ошибка записи пачки из {len(batch)} операций: {e}")
+            try:
+                await conn.rollback()
+            except Exception:
+                pass
+            if self._on_rollback:
+                self._on_rollback()
+            self.failed += len(batch)
+            for _, future, _, _ in batch:
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.operations += len(batch)
+        self.last_commit = elapsed
+        self.total_commit += elapsed
+        self.max_commit = max(self.max_commit, elapsed)
+        if self._on_commit:
+            self._on_commit()
+
+        for (_, future, _, on_commit), (ok, value) in zip(batch, results):
+            if not ok:
+                self.failed += 1
+                if future is None:
+                    print(f"❌ [Database] Ошибка отложенной записи: {value}")
+                elif not future.done():
+                    future.set_exception(value)
+                continue
+            if on_commit:
+                try:
+                    on_commit(value)
+                except Exception as e:
+                    print(f"❌ [Database] Ошибка обработчика после commit: {e}")
+            if future is not None and not future.done():
+                future.set_result(value)
+
+    def stats(self) -> Dict[str, Any]:
+        """Глубина очереди, размер пачек и время commit"""
+        return {
+            "depth": len(self._pending),
+            "max_depth": self.max_depth,
+            "batches": self.batches,
+            "operations": self.operations,
+            "failed": self.failed,
+            "avg_batch": self.operations / self.batches if self.batches else 0.0,
+            "last_commit_ms": self.last_commit * 1000,
+            "avg_commit_ms": self.total_commit / self.batches * 1000 if self.batches else 0.0,
+            "max_commit_ms": self.max_commit * 1000
+        }
+
 class Database:
+    # Сколько раз get_user перечитывает строку, если чтение пересеклось с commit пачки
+    READ_RETRIES = 3
+
     def __init__(self):
         self.conn = None
-        # Кэш для настроек, чтобы не дергать БД каждую миллисекунду
-        self.settings_cache = {}
+        # Пул соединений только для чтения (в WAL не ждут писателя)
+        self._read_pool: Optional[asyncio.Queue] = None
+        self._readers: List[aiosqlite.Connection] = []
+        # Кэш для настроек, чтобы не дергать БД каждую миллисекунду: (guild_id, key) -> value
+        self.settings_cache: Dict[tuple, str] = {}
+        # Постоянные кулдауны команд: (guild_id, user_id, action) -> unix-время окончания
+        self.cooldown_cache: Dict[tuple, float] = {}
+        # Кэш строк пользователей для get_user, ключ (guild_id, user_id)
+        self.user_cache = UserCache(Config.USER_CACHE_SIZE, Config.USER_CACHE_TTL)
+        # Время и строки запросов по методам, лог медленных запросов
+        self.query_stats = QueryStats(Config.DB_QUERY_SAMPLES, Config.DB_SLOW_QUERY_MS)
+        # Счетчики изменений колонок users по серверам (по ним кэши топов понимают, что устарели)
+        self.column_versions: Dict[int, Dict[str, int]] = {}
+        # Отложенная запись: накопленные дельты XP/монет, ключ (guild_id, user_id)
+        self.pending_deltas: Dict[tuple, Dict[str, Any]] = {}
+        self._flushing: Dict[tuple, Dict[str, Any]] = {}
+        # Журнал транзакций: строки (guild_id, user_id, amount, reason, counterparty, created_at) ждут записи пачкой
+        self.pending_ledger: List[tuple] = []
+        self._flushing_ledger: List[tuple] = []
+        # Сколько монет реально зачислено/списано по журналу пачки (с учетом нуля) - для кэша
+        self._flushing_coins: Dict[tuple, int] = {}
+        self._last_snapshot = time.monotonic()
+        self._last_cooldown_purge = time.monotonic()
+        # Все записи идут через очередь group commit; буферы выше сбрасываются в каждой ее пачке
+        self.writes = WriteQueue(
+            Config.DB_COMMIT_WINDOW, Config.DB_COMMIT_MAX_BATCH,
+            flush=self._flush_buffers, on_commit=self._apply_flushed, on_rollback=self._restore_flushed,
+            query_stats=self.query_stats
+        )
+        # Создается в connect() по той же причине, что и события WriteQueue
+        self._flush_event: Optional[asyncio.Event] = None
+        self._flush_task = None
 
     async def connect(self):
         """Создает подключение к БД и таблицы."""
         try:
-            self.conn = await aiosqlite.connect(DB_NAME)
-            self.conn.row_factory = aiosqlite.Row
+            profile = Config.DB_STORAGE_PROFILES.get(Config.DB_STORAGE_PROFILE)
+            if profile is None:
+                print(f"⚠️ [Database] Неизвестный профиль {Config.DB_STORAGE_PROFILE}, использую 'wal'")
+                profile = Config.DB_STORAGE_PROFILES["wal"]
+            
+            conn = await aiosqlite.connect(DB_NAME)
+            conn.row_factory = aiosqlite.Row
+            # Все запросы идут через обертку с замерами (см. QueryStats)
+            self.conn = InstrumentedConnection(conn, self.query_stats)
+            # Уровень по XP считается прямо в UPDATE при сбросе дельт (см. _flush_buffers)
+            await conn.create_function("xp_level", 1, Config.get_level_from_xp, deterministic=True)
+            await self.conn.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+            await self.apply_pragmas(self.conn, profile)
             await self.create_tables()
+            self.writes.start(self.conn)
+            await self.open_read_pool(profile)
             await self.load_settings_cache()
+            await self.load_cooldown_cache()
+            self._flush_event = asyncio.Event()
+            self._flush_task = asyncio.create_task(self._flush_loop())
             print("✅ [Database] Подключение успешно! Таблицы проверены.")
         except Exception as e:
             print(f"❌ [Database] Ошибка подключения: {e}")
             raise
 
     async def create_tables(self):
-        """Создает все необходимые таблицы"""
-        try:
-            # --- ПОЛЬЗОВАТЕЛИ И ЭКОНОМИКА ---
-            await self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    user_id INTEGER PRIMARY KEY,
-                    xp INTEGER DEFAULT 0,
-                    level INTEGER DEFAULT 1,
-                    coins INTEGER DEFAULT 0,
-                    invites INTEGER DEFAULT 0,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # --- ИНВЕНТАРЬ ---
-            await self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS inventory (
-                    user_id INTEGER,
-                    item_id TEXT,
-                    count INTEGER DEFAULT 1,
-                    PRIMARY KEY (user_id, item_id),
-                    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
-                )
-            """)
-            
-            # --- ПРЕДУПРЕЖДЕНИЯ ---
-            await self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS warns (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    admin_id INTEGER NOT NULL,
-                    reason TEXT,
-                    date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE
-                )
-            """)
-            
-            # --- АКТИВНЫЕ СОБЫТИЯ ---
-            await self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS active_events (
-                    message_id INTEGER PRIMARY KEY,
-                    channel_id INTEGER NOT NULL,
-                    reward INTEGER DEFAULT 0,
-                    required_users INTEGER DEFAULT 1,
-                    users_list TEXT DEFAULT '[]',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # --- НАСТРОЙКИ СЕРВЕРА (Key-Value хранилище) ---
-            await self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS server_settings (
-                    key TEXT PRIMARY KEY,
-                    value TEXT NOT NULL,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-
-            # --- ПРИВАТНЫЕ ГОЛОСОВЫЕ КАНАЛЫ ---
-            await self.conn.execute("""
-                CREATE TABLE IF NOT EXISTS voice_channels (
-                    channel_id INTEGER PRIMARY KEY,
-                    owner_id INTEGER NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Создаем индексы для ускорения запросов
-            await self.conn.execute("CREATE INDEX IF NOT EXISTS idx_users_level ON users(level DESC, xp DESC)")
-            await self.conn.execute("CREATE INDEX IF NOT EXISTS idx_warns_user ON warns(user_id)")
-            await self.conn.execute("CREATE INDEX IF NOT EXISTS idx_voice_owner ON voice_channels(owner_id)")
-            
-            await self.conn.commit()
-            print("✅ [Database] Все таблицы созданы и проверены.")
+        """Применяет недостающие миграции схемы (см. migrations.py)"""
+        try:
+            version = await migrations.migrate(self.conn)
+            print(f"✅ [Database] Схема БД версии {version}.")
         except Exception as e:
-            print(f"❌ [Database] Ошибка создания таблиц: {e}")
+            print(f"❌ [Database] Ошибка миграции схемы: {e}")
             raise
 
+    async def apply_pragmas(self, conn: aiosqlite.Connection, profile: Dict[str, Any]):
+        """Применяет к соединению настройки из профиля хранилища"""
+        await conn.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+        await conn.execute(f"PRAGMA mmap_size = {int(profile['mmap_size'])}")
+        await conn.execute(f"PRAGMA cache_size = {int(profile['cache_size'])}")
+        await conn.execute(f"PRAGMA busy_timeout = {int(profile['busy_timeout'])}")
+
+    async def open_read_pool(self, profile: Dict[str, Any]):
+        """Открывает соединения только для чтения для тяжелых SELECT-запросов"""
+        size = int(profile.get("read_pool_size", 0))
+        if size <= 0:
+            return
+        
+        self._read_pool = asyncio.Queue()
+        for _ in range(size):
+            conn = await aiosqlite.connect(f"file:{DB_NAME}?mode=ro", uri=True)
+            conn.row_factory = aiosqlite.Row
+            reader = InstrumentedConnection(conn, self.query_stats)
+            await self.apply_pragmas(reader, profile)
+            await reader.execute("PRAGMA query_only = ON")
+            self._readers.append(reader)
+            self._read_pool.put_nowait(reader)
+        print(f"✅ [Database] Открыто {size} соединений для чтения.")
+
+    @asynccontextmanager
+    async def _reader(self):
+        """Выдает свободное соединение для чтения (или основное, если пула нет)"""
+        if self._read_pool is None:
+            yield self.conn
+            return
+        
+        reader = await self._read_pool.get()
+        try:
+            yield reader
+        finally:
+            self._read_pool.put_nowait(reader)
+
+    async def backup(self, path: str):
+        """
+        Копирует БД в файл path через online backup API SQLite.
+        Источник - отдельное соединение: в копию попадает только зафиксированное
+        (вместе с WAL), а запись в это время не останавливается.
+        """
+        await self.flush_pending()
+        source = await aiosqlite.connect(f"file:{DB_NAME}?mode=ro", uri=True)
+        try:
+            target = await aiosqlite.connect(path)
+            try:
+                await source.backup(target)
+            finally:
+                await target.close()
+        finally:
+            await source.close()
+
     async def close(self):
-        """Закрывает соединение с БД"""
+        """Сбрасывает накопленные изменения и закрывает соединение с БД"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            self._flush_task = None
+        for reader in self._readers:
+            await reader.close()
+        self._readers = []
+        self._read_pool = None
         if self.conn:
+            await self.flush_pending()
+            await self.writes.close()
             await self.conn.close()
+            self.conn = None
             print("✅ [Database] Соединение закрыто.")
 
+    # ==========================================
+    # ⏳ ОТЛОЖЕННАЯ ЗАПИСЬ (Write-behind)
+    # ==========================================
+
+    def queue_user_delta(self, guild_id: int, user_id: int, xp: int = 0, coins: int = 0, reason: str = "adjust"):
+        """
+        Копит прирост XP/монет в памяти вместо немедленного UPDATE.
+        Все накопленное записывается одной транзакцией в flush_pending(),
+        уровень при этом выводится из итогового XP.
+        """
+        if coins:
+            self._record(guild_id, user_id, coins, reason)
+        key = (guild_id, user_id)
+        entry = self.pending_deltas.get(key)
+        if entry is None:
+            entry = self.pending_deltas[key] = {"xp": 0, "coins": 0}
+        entry["xp"] += xp
+        entry["coins"] += coins
+
+        if len(self.pending_deltas) >= Config.DB_FLUSH_MAX_PENDING and self._flush_event:
+            self._flush_event.set()
+
+    def _record(self, guild_id: int, user_id: int, amount: int, reason: str, counterparty: int = None):
+        """Ставит строку журнала транзакций в очередь на запись"""
+        self.pending_ledger.append((guild_id, user_id, amount, reason, counterparty, time.time()))
+        if len(self.pending_ledger) >= Config.DB_FLUSH_MAX_PENDING and self._flush_event:
+            self._flush_event.set()
+
+    def _merge_pending(self, user: Dict[str, Any]) -> Dict[str, Any]:
+        """Накладывает еще не записанные дельты на строку из БД"""
+        key = (user["guild_id"], user["user_id"])
+        for source in (self._flushing, self.pending_deltas):
+            entry = source.get(key)
+            if entry is None:
+                continue
+            user["xp"] = max(0, user["xp"] + entry["xp"])
+            user["coins"] = max(0, user["coins"] + entry["coins"])
+            user["level"] = max(user["level"], Config.get_level_from_xp(user["xp"]))
+        return user
+
+    async def _flush_loop(self):
+        """Фоновый сброс по таймеру или по заполнению буфера"""
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=Config.DB_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            await self.flush_pending()
+            if time.monotonic() - self._last_snapshot >= Config.BALANCE_SNAPSHOT_INTERVAL:
+                await self.snapshot_balances()
+            if time.monotonic() - self._last_cooldown_purge >= Config.COOLDOWN_PURGE_INTERVAL:
+                await self.purge_cooldowns()
+
+    async def flush_pending(self):
+        """Записывает все накопленные дельты и строки журнала и ждет commit"""
+        if not self.conn or not (self.pending_deltas or self.pending_ledger):
+            return
+        try:
+            await self._transaction(self._noop, flush=True)
+        except Exception as e:
+            print(f"❌ [Database] Ошибка сброса отложенных изменений: {e}")
+
+    @staticmethod
+    async def _noop(conn: aiosqlite.Connection):
+        return None
+
+    @staticmethod
+    def _combine(older: Dict[str, Any], newer: Dict[str, Any]) -> Dict[str, Any]:
+        """Складывает две дельты одного пользователя"""
+        return {"xp": older["xp"] + newer["xp"], "coins": older["coins"] + newer["coins"]}
+
+    async def _flush_buffers(self, conn: aiosqlite.Connection):
+        """
+        Пишет буферы write-behind в открытую транзакцию очереди записи (без commit).
+        Записанное копится в _flushing до commit или отката пачки.
+        """
+        deltas, self.pending_deltas = self.pending_deltas, {}
+        ledger, self.pending_ledger = self.pending_ledger, []
+        for key, d in deltas.items():
+            entry = self._flushing.get(key)
+            self._flushing[key] = d if entry is None else self._combine(entry, d)
+        self._flushing_ledger.extend(ledger)
+
+        if deltas:
+            await conn.executemany(
+                "INSERT OR IGNORE INTO users (guild_id, user_id) VALUES (?, ?)",
+                list(deltas)
+            )
+            await conn.executemany(
+                """UPDATE users SET xp = MAX(0, xp + ?), level = MAX(level, xp_level(MAX(0, xp + ?)))
+                   WHERE guild_id = ? AND user_id = ?""",
+                [(d["xp"], d["xp"], *key) for key, d in deltas.items() if d["xp"]]
+            )
+        # Монеты идут через журнал: баланс меняется ровно на записанные в него суммы
+        for key, amount in (await self._apply_ledger(conn, ledger)).items():
+            self._flushing_coins[key] = self._flushing_coins.get(key, 0) + amount
+
+    async def _apply_ledger(self, conn: aiosqlite.Connection, rows: List[tuple]) -> Dict[tuple, int]:
+        """
+        Применяет строки (guild_id, user_id, amount, reason, counterparty, created_at) по порядку.
+        Баланс не уходит в минус, и в журнал пишется реально примененная сумма
+        (MAX(-баланс, amount)), а не запрошенная, поэтому rebuild_balance сходится с coins.
+        Возвращает итог по (guild_id, user_id). Без commit.
+        """
+        if not rows:
+            return {}
+        async with conn.execute("SELECT COALESCE(MAX(id), 0) FROM transactions") as cursor:
+            start = (await cursor.fetchone())[0]
+        keys = list(dict.fromkeys((guild_id, user_id) for guild_id, user_id, *_ in rows))
+        await conn.executemany("INSERT OR IGNORE INTO users (guild_id, user_id) VALUES (?, ?)", keys)
+        # Баланс на момент строки = coins до пачки + уже записанное в журнал после start
+        await conn.executemany(
+            """INSERT INTO transactions (guild_id, user_id, amount, reason, counterparty, created_at)
+               SELECT guild_id, user_id, applied, ?, ?, ? FROM (
+                   SELECT u.guild_id, u.user_id, MAX(-(u.coins + COALESCE(
+                       (SELECT SUM(t.amount) FROM transactions t
+                        WHERE t.guild_id = u.guild_id AND t.user_id = u.user_id AND t.id > ?), 0)), ?) AS applied
+                   FROM users u WHERE u.guild_id = ? AND u.user_id = ?
+               ) WHERE applied != 0""",
+            [(reason, counterparty, created_at, start, amount, guild_id, user_id)
+             for guild_id, user_id, amount, reason, counterparty, created_at in rows]
+        )
+        async with conn.execute(
+            """SELECT guild_id, user_id, SUM(amount) FROM transactions
+               WHERE id > ? GROUP BY guild_id, user_id""",
+            (start,)
+        ) as cursor:
+            applied = {(row[0], row[1]): row[2] for row in await cursor.fetchall()}
+        await conn.executemany(
+            "UPDATE users SET coins = coins + ? WHERE guild_id = ? AND user_id = ?",
+            [(amount, *key) for key, amount in applied.items()]
+        )
+        return applied
+
+    def _restore_flushed(self):
+        """После отката пачки возвращает дельты и журнал в буфер, чтобы не потерять их"""
+        self.pending_ledger = self._flushing_ledger + self.pending_ledger
+        for key, d in self._flushing.items():
+            entry = self.pending_deltas.get(key)
+            self.pending_deltas[key] = d if entry is None else self._combine(d, entry)
+        self._flushing = {}
+        self._flushing_ledger = []
+        self._flushing_coins = {}
+
+    def _apply_flushed(self):
+        """После commit переносит записанные дельты в кэш"""
+        if self._flushing:
+            for key, d in self._flushing.items():
+                self.user_cache.apply_delta(key, "xp", d["xp"])
+                self.user_cache.apply_delta(key, "coins", self._flushing_coins.get(key, 0))
+                self.user_cache.sync_level(key)
+            for guild_id in {guild_id for guild_id, _ in self._flushing}:
+                self._bump_columns(guild_id, "xp", "coins", "level")
+        self._flushing = {}
+        self._flushing_ledger = []
+        self._flushing_coins = {}
+
+    # ==========================================
+    # ✍️ ОЧЕРЕДЬ ЗАПИСИ (Group commit)
+    # ==========================================
+
+    async def _transaction(self, op: Callable[[aiosqlite.Connection], Awaitable[Any]], durable: bool = True,
+                           flush: bool = False, on_commit: Callable[[Any], None] = None):
+        """
+        Выполняет op(conn) в ближайшей пачке очереди записи.
+        durable=True - ждет commit и возвращает результат op (ошибка пробрасывается),
+        durable=False - возвращается сразу. flush=True - перед op сбрасываются буферы write-behind.
+        Запросы op числятся в статистике за методом, который вызвал _transaction.
+        """
+        # op выполняется из WriteQueue._commit, где вызвавшего метода уже нет на стеке,
+        # а имя замыкания без co_qualname (Python < 3.11) - просто "op"
+        method = InstrumentedConnection.caller_name(1)
+
+        async def labeled(conn):
+            return await op(conn.labeled(method))
+        future = self.writes.submit(labeled, durable=durable, flush=flush, on_commit=on_commit)
+        if future is not None:
+            return await future
+        return None
+
+    async def _write(self, query: str, params: tuple = (), durable: bool = True) -> Optional[int]:
+        """Один оператор через очередь записи; с durable=True возвращает rowcount"""
+        # В статистике запрос числится за методом, который вызвал _write
+        method = InstrumentedConnection.caller_name(1)
+        
+        async def op(conn):
+            cursor = await conn.execute(query, params, method=method)
+            return cursor.rowcount
+        return await self._transaction(op, durable=durable)
+
     # ==========================================
     # ⚙️ МЕНЕДЖЕР КОНФИГУРАЦИИ (Config System)
     # ==========================================
@@ -115,35 +833,34 @@ class Database:
     async def load_settings_cache(self):
         """Выгружает настройки в RAM для быстрого доступа."""
         try:
-            async with self.conn.execute("SELECT key, value FROM server_settings") as cursor:
+            async with self.conn.execute("SELECT guild_id, key, value FROM server_settings") as cursor:
                 rows = await cursor.fetchall()
-                self.settings_cache = {row['key']: row['value'] for row in rows}
+                self.settings_cache = {(row['guild_id'], row['key']): row['value'] for row in rows}
             print(f"✅ [Database] Загружено {len(self.settings_cache)} настроек в кэш.")
         except Exception as e:
             print(f"❌ [Database] Ошибка загрузки кэша: {e}")
             self.settings_cache = {}
 
-    async def set_config(self, key: str, value):
-        """Сохраняет настройку (ID канала/роли)."""
+    async def set_config(self, guild_id: int, key: str, value):
+        """Сохраняет настройку сервера (ID канала/роли)."""
         try:
             str_value = str(value)
-            await self.conn.execute(
-                """INSERT INTO server_settings (key, value) VALUES (?, ?) 
-                   ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP""",
-                (key, str_value)
+            await self._write(
+                """INSERT INTO server_settings (guild_id, key, value) VALUES (?, ?, ?) 
+                   ON CONFLICT(guild_id, key) DO UPDATE SET value = excluded.value, updated_at = CURRENT_TIMESTAMP""",
+                (guild_id, key, str_value)
             )
-            await self.conn.commit()
-            self.settings_cache[key] = str_value
-            print(f"✅ [Config] Сохранено: {key} = {str_value}")
+            self.settings_cache[(guild_id, key)] = str_value
+            print(f"✅ [Config] Сохранено для {guild_id}: {key} = {str_value}")
         except Exception as e:
             print(f"❌ [Config] Ошибка сохранения {key}: {e}")
 
-    def get_config(self, key: str, default=None, cast_type=int):
+    def get_config(self, guild_id: int, key: str, default=None, cast_type=int):
         """
-        Получает значение из кэша мгновенно.
+        Получает значение настройки сервера из кэша мгновенно.
         Используй cast_type=int для ID каналов.
         """
-        val = self.settings_cache.get(key)
+        val = self.settings_cache.get((guild_id, key))
         if val is None: 
             return default
         try:
@@ -152,17 +869,157 @@ class Database:
             print(f"⚠️ [Config] Ошибка преобразования {key}: {val}")
             return default
 
-    async def delete_config(self, key: str):
-        """Удаляет настройку"""
+    async def delete_config(self, guild_id: int, key: str):
+        """Удаляет настройку сервера"""
         try:
-            await self.conn.execute("DELETE FROM server_settings WHERE key = ?", (key,))
-            await self.conn.commit()
-            if key in self.settings_cache:
-                del self.settings_cache[key]
-            print(f"✅ [Config] Удалено: {key}")
+            await self._write(
+                "DELETE FROM server_settings WHERE guild_id = ? AND key = ?",
+                (guild_id, key)
+            )
+            self.settings_cache.pop((guild_id, key), None)
+            print(f"✅ [Config] Удалено для {guild_id}: {key}")
         except Exception as e:
             print(f"❌ [Config] Ошибка удаления {key}: {e}")
 
+    # ==========================================
+    # ⏳ ПОСТОЯННЫЕ КУЛДАУНЫ
+    # ==========================================
+
+    async def load_cooldown_cache(self):
+        """Удаляет истекшие кулдауны и выгружает действующие в RAM"""
+        try:
+            now = time.time()
+            await self._write("DELETE FROM cooldowns WHERE expires_at <= ?", (now,))
+            async with self.conn.execute(
+                "SELECT guild_id, user_id, action, expires_at FROM cooldowns WHERE expires_at > ?", (now,)
+            ) as cursor:
+                rows = await cursor.fetchall()
+            self.cooldown_cache = {
+                (row['guild_id'], row['user_id'], row['action']): row['expires_at'] for row in rows
+            }
+            print(f"✅ [Database] Загружено {len(self.cooldown_cache)} кулдаунов в кэш.")
+        except Exception as e:
+            print(f"❌ [Database] Ошибка загрузки кулдаунов: {e}")
+            self.cooldown_cache = {}
+
+    async def purge_cooldowns(self):
+        """Удаляет истекшие кулдауны из БД и кэша (get_cooldown чистит только то, что спрашивают)"""
+        self._last_cooldown_purge = time.monotonic()
+        now = time.time()
+        expired = [key for key, expires_at in self.cooldown_cache.items() if expires_at <= now]
+        for key in expired:
+            del self.cooldown_cache[key]
+        try:
+            await self._write("DELETE FROM cooldowns WHERE expires_at <= ?", (now,), durable=False)
+        except Exception as e:
+            print(f"❌ [DB Error] purge_cooldowns: {e}")
+
+    def get_cooldown(self, guild_id: int, user_id: int, action: str) -> float:
+        """Оставшееся время кулдауна в секундах (из кэша, без запроса к БД)"""
+        key = (guild_id, user_id, action)
+        expires_at = self.cooldown_cache.get(key)
+        if expires_at is None:
+            return 0.0
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            del self.cooldown_cache[key]
+            return 0.0
+        return remaining
+
+    async def set_cooldown(self, guild_id: int, user_id: int, action: str, seconds: float):
+        """
+        Ставит кулдаун: сначала в кэш (сразу виден следующей проверке),
+        затем в БД, чтобы он пережил перезапуск.
+        """
+        expires_at = time.time() + seconds
+        self.cooldown_cache[(guild_id, user_id, action)] = expires_at
+        try:
+            await self._write(
+                """INSERT INTO cooldowns (guild_id, user_id, action, expires_at) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(guild_id, user_id, action) DO UPDATE SET expires_at = excluded.expires_at""",
+                (guild_id, user_id, action, expires_at)
+            )
+        except Exception as e:
+            print(f"❌ [DB Error] set_cooldown: {e}")
+
+    async def clear_cooldown(self, guild_id: int, user_id: int, action: str):
+        """Снимает кулдаун"""
+        self.cooldown_cache.pop((guild_id, user_id, action), None)
+        try:
+            await self._write(
+                "DELETE FROM cooldowns WHERE guild_id = ? AND user_id = ? AND action = ?",
+                (guild_id, user_id, action)
+            )
+        except Exception as e:
+            print(f"❌ [DB Error] clear_cooldown: {e}")
+
+    # ==========================================
+    # 🛡️ ПРАВИЛА АВТОМОДЕРАЦИИ
+    # ==========================================
+
+    async def get_automod_settings(self) -> Dict[int, Dict[str, str]]:
+        """Загружает настройки автомода всех серверов: guild_id -> {key: value}"""
+        try:
+            async with self.conn.execute("SELECT guild_id, key, value FROM automod_settings") as cursor:
+                rows = await cursor.fetchall()
+            settings = {}
+            for row in rows:
+                settings.setdefault(row['guild_id'], {})[row['key']] = row['value']
+            return settings
+        except Exception as e:
+            print(f"❌ [AutoMod] Ошибка загрузки настроек: {e}")
+            return {}
+
+    async def get_automod_words(self) -> Dict[int, List[str]]:
+        """Загружает запрещенные слова всех серверов: guild_id -> [слова]"""
+        try:
+            async with self.conn.execute("SELECT guild_id, word FROM automod_words") as cursor:
+                rows = await cursor.fetchall()
+            words = {}
+            for row in rows:
+                words.setdefault(row['guild_id'], []).append(row['word'])
+            return words
+        except Exception as e:
+            print(f"❌ [AutoMod] Ошибка загрузки слов: {e}")
+            return {}
+
+    async def set_automod_setting(self, guild_id: int, key: str, value: str) -> bool:
+        """Сохраняет правило автомода сервера"""
+        try:
+            await self._write(
+                """INSERT INTO automod_settings (guild_id, key, value) VALUES (?, ?, ?)
+                   ON CONFLICT(guild_id, key) DO UPDATE SET value = excluded.value""",
+                (guild_id, key, value)
+            )
+            return True
+        except Exception as e:
+            print(f"❌ [AutoMod] Ошибка сохранения {key} для сервера {guild_id}: {e}")
+            return False
+
+    async def add_automod_word(self, guild_id: int, word: str) -> bool:
+        """Добавляет запрещенное слово серверу"""
+        try:
+            await self._write(
+                "INSERT OR IGNORE INTO automod_words (guild_id, word) VALUES (?, ?)",
+                (guild_id, word)
+            )
+            return True
+        except Exception as e:
+            print(f"❌ [AutoMod] Ошибка добавления слова для сервера {guild_id}: {e}")
+            return False
+
+    async def remove_automod_word(self, guild_id: int, word: str) -> bool:
+        """Удаляет запрещенное слово сервера"""
+        try:
+            await self._write(
+                "DELETE FROM automod_words WHERE guild_id = ? AND word = ?",
+                (guild_id, word)
+            )
+            return True
+        except Exception as e:
+            print(f"❌ [AutoMod] Ошибка удаления слова для сервера {guild_id}: {e}")
+            return False
+
     # ==========================================
     # 🔊 УПРАВЛЕНИЕ ВОЙСАМИ (Voice System)
     # ==========================================
@@ -170,11 +1027,10 @@ class Database:
     async def add_voice_channel(self, channel_id: int, owner_id: int):
         """Добавляет голосовой канал в БД"""
         try:
-            await self.conn.execute(
+            await self._write(
                 "INSERT OR IGNORE INTO voice_channels (channel_id, owner_id) VALUES (?, ?)", 
                 (channel_id, owner_id)
             )
-            await self.conn.commit()
         except Exception as e:
             print(f"❌ [Voice] Ошибка добавления канала {channel_id}: {e}")
 
@@ -194,20 +1050,20 @@ class Database:
     async def remove_voice_channel(self, channel_id: int):
         """Удаляет голосовой канал из БД"""
         try:
-            await self.conn.execute("DELETE FROM voice_channels WHERE channel_id = ?", (channel_id,))
-            await self.conn.commit()
+            await self._write("DELETE FROM voice_channels WHERE channel_id = ?", (channel_id,))
         except Exception as e:
             print(f"❌ [Voice] Ошибка удаления канала {channel_id}: {e}")
 
     async def get_user_voice_channels(self, owner_id: int) -> List[int]:
         """Получает все голосовые каналы пользователя"""
         try:
-            async with self.conn.execute(
-                "SELECT channel_id FROM voice_channels WHERE owner_id = ?", 
-                (owner_id,)
-            ) as cursor:
-                rows = await cursor.fetchall()
-                return [row['channel_id'] for row in rows]
+            async with self._reader() as conn:
+                async with conn.execute(
+                    "SELECT channel_id FROM voice_channels WHERE owner_id = ?", 
+                    (owner_id,)
+                ) as cursor:
+                    rows = await cursor.fetchall()
+                    return [row['channel_id'] for row in rows]
         except Exception as e:
             print(f"❌ [Voice] Ошибка получения каналов пользователя {owner_id}: {e}")
             return []
@@ -216,28 +1072,50 @@ class Database:
     # 👤 ЮЗЕРЫ И ЭКОНОМИКА
     # ==========================================
     
-    async def get_user(self, user_id: int) -> Dict[str, Any]:
-        """Получает данные пользователя или создает новую запись"""
+    def _default_user(self, guild_id: int, user_id: int) -> Dict[str, Any]:
+        return {"guild_id": guild_id, "user_id": user_id, "xp": 0, "level": 1, "coins": 0, "invites": 0}
+
+    async def get_user(self, guild_id: int, user_id: int) -> Dict[str, Any]:
+        """Получает данные пользователя на сервере или создает новую запись"""
+        key = (guild_id, user_id)
+        cached = self.user_cache.get(key)
+        if cached is not None:
+            return self._merge_pending(cached)
+        
+        row = None
+        self.user_cache.begin_load(key)
         try:
-            async with self.conn.execute(
-                "SELECT * FROM users WHERE user_id = ?", 
-                (user_id,)
-            ) as cursor:
-                user = await cursor.fetchone()
-                if not user:
-                    await self.conn.execute(
-                        "INSERT INTO users (user_id) VALUES (?)", 
-                        (user_id,)
-                    )
-                    await self.conn.commit()
-                    return {"user_id": user_id, "xp": 0, "level": 1, "coins": 0, "invites": 0}
-                return dict(user)
-        except Exception as e:
-            print(f"❌ [Users] Ошибка получения пользователя {user_id}: {e}")
-            return {"user_id": user_id, "xp": 0, "level": 1, "coins": 0, "invites": 0}
-
-    async def update_user(self, user_id: int, xp: int = None, level: int = None, coins: int = None):
-        """Обновляет данные пользователя"""
+            # Нужны зафиксированные данные, а незаписанное накладывает _merge_pending.
+            # Чтение, пересекшееся с пачкой, могло увидеть ее частично (а без пула читателей -
+            # еще и незафиксированные строки), поэтому его повторяем и в кэш не кладем
+            consistent = False
+            for _ in range(self.READ_RETRIES):
+                await self.writes.wait_idle()
+                generation = self.writes.generation
+                async with self._reader() as conn:
+                    async with conn.execute(
+                        "SELECT * FROM users WHERE guild_id = ? AND user_id = ?", 
+                        key
+                    ) as cursor:
+                        user = await cursor.fetchone()
+                if self.writes.generation == generation:
+                    consistent = True
+                    break
+            if not user:
+                # Ждать commit не нужно: строка по умолчанию совпадает с тем, что будет записано
+                await self._write("INSERT OR IGNORE INTO users (guild_id, user_id) VALUES (?, ?)", key, durable=False)
+                user = self._default_user(guild_id, user_id)
+            if consistent:
+                row = dict(user)
+            return self._merge_pending(dict(user))
+        except Exception as e:
+            print(f"❌ [Users] Ошибка получения пользователя {user_id} ({guild_id}): {e}")
+            return self._default_user(guild_id, user_id)
+        finally:
+            self.user_cache.end_load(key, row)
+
+    async def update_user(self, guild_id: int, user_id: int, xp: int = None, level: int = None, coins: int = None):
+        """Обновляет данные пользователя на сервере"""
         try:
             updates = []
             values = []
@@ -255,139 +1133,389 @@ class Database:
             if not updates:
                 return
             
-            values.append(user_id)
-            query = f"UPDATE users SET {', '.join(updates)} WHERE user_id = ?"
+            key = (guild_id, user_id)
+            # Накопленные дельты не отбрасываем: пачка пишет их до op, и абсолютное значение
+            # их перекрывает, а при откате пачки они вернутся в буфер вместе с ней
+            
+            values.extend(key)
+            query = f"UPDATE users SET {', '.join(updates)} WHERE guild_id = ? AND user_id = ?"
+            
+            fields = {"xp": xp, "level": level, "coins": coins}
+            changed = {k: v for k, v in fields.items() if v is not None}
+            
+            async def op(conn):
+                await conn.execute(query, values)
+                if coins is not None:
+                    # Абсолютный баланс не выражается через журнал - фиксируем его снимком
+                    await self._snapshot(conn, key)
+            
+            def applied(_):
+                self.user_cache.update(key, **changed)
+                self._bump_columns(guild_id, *changed)
             
-            await self.conn.execute(query, values)
-            await self.conn.commit()
+            # Перед снимком в транзакцию должен попасть весь накопленный журнал
+            await self._transaction(op, flush=coins is not None, on_commit=applied)
         except Exception as e:
-            print(f"❌ [Users] Ошибка обновления пользователя {user_id}: {e}")
+            print(f"❌ [Users] Ошибка обновления пользователя {user_id} ({guild_id}): {e}")
+
+    def _bump_columns(self, guild_id: int, *columns: str):
+        """Отмечает, что значения колонок users на сервере изменились"""
+        versions = self.column_versions.setdefault(guild_id, {})
+        for column in columns:
+            versions[column] = versions.get(column, 0) + 1
+
+    def get_column_versions(self, guild_id: int, columns) -> tuple:
+        """Текущие счетчики изменений для набора колонок на сервере"""
+        versions = self.column_versions.get(guild_id, {})
+        return tuple(versions.get(column, 0) for column in columns)
+
+    async def _increment(self, column: str, guild_id: int, user_id: int, amount: int, reason: str = None,
+                         durable: bool = True):
+        """
+        Атомарно прибавляет amount к колонке (не уходит в минус).
+        Монеты меняются через журнал (_apply_ledger) с причиной reason.
+        """
+        await self._bulk_increment(column, guild_id, [(user_id, amount)], reason, durable)
+
+    async def _bulk_increment(self, column: str, guild_id: int, pairs: List[tuple], reason: str = None,
+                              durable: bool = True):
+        """Атомарно применяет пары (user_id, amount) к колонке в одной операции очереди записи"""
+        if not pairs:
+            return
+        
+        async def op(conn):
+            if column == "coins":
+                now = time.time()
+                return await self._apply_ledger(
+                    conn, [(guild_id, user_id, amount, reason or "adjust", None, now) for user_id, amount in pairs]
+                )
+            await conn.executemany(
+                f"""INSERT INTO users (guild_id, user_id, {column}) VALUES (?, ?, MAX(0, ?))
+                    ON CONFLICT(guild_id, user_id) DO UPDATE SET {column} = MAX(0, {column} + ?)""",
+                [(guild_id, user_id, amount, amount) for user_id, amount in pairs]
+            )
+            return None
+        
+        def applied(coins):
+            if coins is not None:
+                for key, amount in coins.items():
+                    self.user_cache.apply_delta(key, column, amount)
+            else:
+                for user_id, amount in pairs:
+                    self.user_cache.apply_delta((guild_id, user_id), column, amount)
+            self._bump_columns(guild_id, column)
+        
+        await self._transaction(op, durable=durable, on_commit=applied)
 
-    async def add_coins(self, user_id: int, amount: int):
-        """Добавляет монеты пользователю"""
+    async def add_coins(self, guild_id: int, user_id: int, amount: int, reason: str = "adjust",
+                        durable: bool = True):
+        """
+        Добавляет монеты пользователю (не дает уйти в минус).
+        durable=False - не ждать commit (изменение видно в кэше после записи пачки).
+        """
         try:
-            user = await self.get_user(user_id)
-            new_coins = max(0, user['coins'] + amount)  # Не даем уйти в минус
-            await self.update_user(user_id, coins=new_coins)
+            await self._increment("coins", guild_id, user_id, amount, reason, durable)
         except Exception as e:
             print(f"❌ [Economy] Ошибка добавления монет пользователю {user_id}: {e}")
     
-    async def add_xp(self, user_id: int, amount: int):
+    async def add_xp(self, guild_id: int, user_id: int, amount: int, durable: bool = True):
         """Добавляет опыт пользователю"""
         try:
-            user = await self.get_user(user_id)
-            new_xp = max(0, user['xp'] + amount)
-            await self.update_user(user_id, xp=new_xp)
+            await self._increment("xp", guild_id, user_id, amount, durable=durable)
         except Exception as e:
             print(f"❌ [XP] Ошибка добавления опыта пользователю {user_id}: {e}")
 
-    async def add_invites(self, user_id: int, amount: int = 1):
+    async def add_invites(self, guild_id: int, user_id: int, amount: int = 1, durable: bool = True):
         """Добавляет приглашения пользователю"""
         try:
-            user = await self.get_user(user_id)
-            new_invites = max(0, user['invites'] + amount)
-            await self.conn.execute(
-                "UPDATE users SET invites = ? WHERE user_id = ?", 
-                (new_invites, user_id)
-            )
-            await self.conn.commit()
+            await self._increment("invites", guild_id, user_id, amount, durable=durable)
         except Exception as e:
             print(f"❌ [Invites] Ошибка добавления приглашений пользователю {user_id}: {e}")
 
-    async def get_top_users(self, limit: int = 10) -> List[Dict]:
-        """Получает топ пользователей по уровню"""
+    async def bulk_add_coins(self, guild_id: int, pairs: List[tuple], reason: str = "adjust",
+                             durable: bool = True):
+        """Добавляет монеты списку пар (user_id, amount) одной транзакцией"""
         try:
-            async with self.conn.execute(
-                "SELECT user_id, level, xp, coins FROM users ORDER BY level DESC, xp DESC LIMIT ?", 
-                (limit,)
-            ) as cursor:
-                rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
+            await self._bulk_increment("coins", guild_id, pairs, reason, durable)
+        except Exception as e:
+            print(f"❌ [Economy] Ошибка массового начисления монет: {e}")
+
+    async def bulk_add_xp(self, guild_id: int, pairs: List[tuple], durable: bool = True):
+        """Добавляет опыт списку пар (user_id, amount) одной транзакцией"""
+        try:
+            await self._bulk_increment("xp", guild_id, pairs, durable=durable)
+        except Exception as e:
+            print(f"❌ [XP] Ошибка массового начисления опыта: {e}")
+
+    async def bulk_add_invites(self, guild_id: int, pairs: List[tuple], durable: bool = True):
+        """Добавляет приглашения списку пар (user_id, amount) одной транзакцией"""
+        try:
+            await self._bulk_increment("invites", guild_id, pairs, durable=durable)
+        except Exception as e:
+            print(f"❌ [Invites] Ошибка массового начисления приглашений: {e}")
+
+    # ==========================================
+    # 🧾 ЖУРНАЛ ТРАНЗАКЦИЙ
+    # ==========================================
+
+    async def transfer_coins(self, guild_id: int, sender_id: int, receiver_id: int, amount: int,
+                             reason: str = "transfer") -> bool:
+        """
+        Переводит монеты одной транзакцией: списание только при достаточном балансе,
+        зачисление и две строки журнала. Бросает InsufficientFunds, если монет не хватило;
+        False - перевод невозможен (сумма, сам себе) или ошибка БД.
+        """
+        if amount <= 0 or sender_id == receiver_id:
+            return False
+        async def op(conn):
+            balance = await self._debit(conn, guild_id, sender_id, amount)
+            if balance is not None:
+                return balance
+            
+            await conn.execute(
+                """INSERT INTO users (guild_id, user_id, coins) VALUES (?, ?, ?)
+                   ON CONFLICT(guild_id, user_id) DO UPDATE SET coins = coins + excluded.coins""",
+                (guild_id, receiver_id, amount)
+            )
+            now = time.time()
+            await conn.executemany(
+                """INSERT INTO transactions (guild_id, user_id, amount, reason, counterparty, created_at)
+                   VALUES (?, ?, ?, ?, ?, ?)""",
+                [(guild_id, sender_id, -amount, reason, receiver_id, now),
+                 (guild_id, receiver_id, amount, reason, sender_id, now)]
+            )
+            return None
+        
+        def applied(balance):
+            if balance is not None:
+                return
+            self.user_cache.apply_delta((guild_id, sender_id), "coins", -amount)
+            self.user_cache.apply_delta((guild_id, receiver_id), "coins", amount)
+            self._bump_columns(guild_id, "coins")
+        
+        try:
+            # Накопленные дельты должны попасть в баланс до проверки
+            balance = await self._transaction(op, flush=True, on_commit=applied)
+        except Exception as e:
+            print(f"❌ [Economy] Ошибка перевода {sender_id} -> {receiver_id}: {e}")
+            return False
+        if balance is not None:
+            raise InsufficientFunds(balance, amount)
+        return True
+
+    async def _debit(self, conn: aiosqlite.Connection, guild_id: int, user_id: int, amount: int) -> Optional[int]:
+        """Условное списание (coins >= amount) без commit: None - списано, иначе текущий баланс"""
+        cursor = await conn.execute(
+            "UPDATE users SET coins = coins - ? WHERE guild_id = ? AND user_id = ? AND coins >= ?",
+            (amount, guild_id, user_id, amount)
+        )
+        if cursor.rowcount:
+            return None
+        async with conn.execute(
+            "SELECT coins FROM users WHERE guild_id = ? AND user_id = ?", (guild_id, user_id)
+        ) as cursor:
+            row = await cursor.fetchone()
+        return row[0] if row else 0
+
+    async def spend_coins(self, guild_id: int, user_id: int, amount: int, reason: str) -> bool:
+        """
+        Списывает amount одним условным UPDATE (coins >= amount) со строкой журнала.
+        Бросает InsufficientFunds, если монет не хватает; False - ошибка БД.
+        """
+        if amount <= 0:
+            return True
+        key = (guild_id, user_id)
+        
+        async def op(conn):
+            balance = await self._debit(conn, guild_id, user_id, amount)
+            if balance is not None:
+                return balance
+            await conn.execute(
+                """INSERT INTO transactions (guild_id, user_id, amount, reason, counterparty, created_at)
+                   VALUES (?, ?, ?, ?, NULL, ?)""",
+                (guild_id, user_id, -amount, reason, time.time())
+            )
+            return None
+        
+        def applied(balance):
+            if balance is None:
+                self.user_cache.apply_delta(key, "coins", -amount)
+                self._bump_columns(guild_id, "coins")
+        
+        try:
+            # Накопленные дельты должны попасть в баланс до проверки
+            balance = await self._transaction(op, flush=True, on_commit=applied)
+        except Exception as e:
+            print(f"❌ [Economy] Ошибка списания {amount} у {user_id} ({guild_id}): {e}")
+            return False
+        if balance is not None:
+            raise InsufficientFunds(balance, amount)
+        return True
+
+    async def _snapshot(self, conn: aiosqlite.Connection, key: tuple = None):
+        """Снимок балансов (всех или одного пользователя) на последнюю строку журнала, без commit"""
+        query = """INSERT INTO balance_snapshots (guild_id, user_id, coins, ledger_id, created_at)
+                   SELECT guild_id, user_id, coins, (SELECT COALESCE(MAX(id), 0) FROM transactions), ?
+                   FROM users {where}
+                   ON CONFLICT(guild_id, user_id) DO UPDATE SET coins = excluded.coins,
+                       ledger_id = excluded.ledger_id, created_at = excluded.created_at"""
+        if key is None:
+            await conn.execute(query.format(where="WHERE true"), (time.time(),))
+        else:
+            await conn.execute(
+                query.format(where="WHERE guild_id = ? AND user_id = ?"), (time.time(), *key)
+            )
+
+    async def snapshot_balances(self):
+        """Записывает снимок всех балансов, чтобы их можно было быстро восстановить по журналу"""
+        self._last_snapshot = time.monotonic()
+        if not self.conn:
+            return
+        try:
+            await self._transaction(self._snapshot, flush=True)
+        except Exception as e:
+            print(f"❌ [Database] Ошибка снимка балансов: {e}")
+
+    async def rebuild_balance(self, guild_id: int, user_id: int) -> int:
+        """Восстанавливает баланс: последний снимок + сумма журнала после него"""
+        await self.flush_pending()
+        try:
+            async with self._reader() as conn:
+                async with conn.execute(
+                    """SELECT COALESCE(s.coins, 0) + COALESCE(SUM(t.amount), 0)
+                       FROM (SELECT ? AS guild_id, ? AS user_id) u
+                       LEFT JOIN balance_snapshots s ON s.guild_id = u.guild_id AND s.user_id = u.user_id
+                       LEFT JOIN transactions t ON t.guild_id = u.guild_id AND t.user_id = u.user_id
+                                               AND t.id > COALESCE(s.ledger_id, 0)""",
+                    (guild_id, user_id)
+                ) as cursor:
+                    row = await cursor.fetchone()
+            return row[0]
+        except Exception as e:
+            print(f"❌ [Economy] Ошибка восстановления баланса {user_id}: {e}")
+            return 0
+
+    async def get_top_users(self, guild_id: int, limit: int = 10) -> List[Dict]:
+        """Получает топ пользователей сервера по уровню (только по индексу idx_users_guild_level)"""
+        try:
+            async with self._reader() as conn:
+                async with conn.execute(
+                    """SELECT user_id, level, xp, coins FROM users WHERE guild_id = ?
+                       ORDER BY level DESC, xp DESC LIMIT ?""", 
+                    (guild_id, limit)
+                ) as cursor:
+                    rows = await cursor.fetchall()
+                    return [dict(row) for row in rows]
         except Exception as e:
             print(f"❌ [Users] Ошибка получения топа: {e}")
             return []
 
+    async def get_top_inviters(self, guild_id: int, limit: int = 10) -> List[Dict]:
+        """Получает топ пользователей сервера по приглашениям"""
+        try:
+            async with self._reader() as conn:
+                async with conn.execute(
+                    """SELECT user_id, invites FROM users WHERE guild_id = ? AND invites > 0
+                       ORDER BY invites DESC LIMIT ?""",
+                    (guild_id, limit)
+                ) as cursor:
+                    rows = await cursor.fetchall()
+                    return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"❌ [Invites] Ошибка получения топа приглашений: {e}")
+            return []
+
+    async def get_user_rank(self, guild_id: int, user_id: int) -> Optional[int]:
+        """
+        Получает место пользователя в топе сервера по уровню.
+        Считает тех, кто выше, по индексу idx_users_guild_level (без выборки строк).
+        """
+        user = await self.get_user(guild_id, user_id)
+        try:
+            async with self._reader() as conn:
+                async with conn.execute(
+                    """SELECT (SELECT COUNT(*) FROM users WHERE guild_id = ? AND level > ?)
+                            + (SELECT COUNT(*) FROM users WHERE guild_id = ? AND level = ? AND xp > ?) AS ahead""",
+                    (guild_id, user['level'], guild_id, user['level'], user['xp'])
+                ) as cursor:
+                    row = await cursor.fetchone()
+                    return row['ahead'] + 1
+        except Exception as e:
+            print(f"❌ [Users] Ошибка получения места пользователя {user_id}: {e}")
+            return None
+
     # ==========================================
     # 🎒 ИНВЕНТАРЬ
     # ==========================================
     
-    async def add_item(self, user_id: int, item_id: str, amount: int = 1):
+    async def add_item(self, guild_id: int, user_id: int, item_id: str, amount: int = 1):
         """Добавляет предмет в инвентарь"""
         try:
-            async with self.conn.execute(
-                "SELECT count FROM inventory WHERE user_id = ? AND item_id = ?", 
-                (user_id, item_id)
-            ) as cursor:
-                result = await cursor.fetchone()
-                
-                if result:
-                    new_count = result['count'] + amount
-                    await self.conn.execute(
-                        "UPDATE inventory SET count = ? WHERE user_id = ? AND item_id = ?",
-                        (new_count, user_id, item_id)
-                    )
-                else:
-                    await self.conn.execute(
-                        "INSERT INTO inventory (user_id, item_id, count) VALUES (?, ?, ?)",
-                        (user_id, item_id, amount)
-                    )
-                await self.conn.commit()
+            await self._write(
+                """INSERT INTO inventory (guild_id, user_id, item_id, count) VALUES (?, ?, ?, ?)
+                   ON CONFLICT(guild_id, user_id, item_id) DO UPDATE SET count = count + excluded.count""",
+                (guild_id, user_id, item_id, amount)
+            )
         except Exception as e:
             print(f"❌ [Inventory] Ошибка добавления предмета {item_id} пользователю {user_id}: {e}")
 
-    async def remove_item(self, user_id: int, item_id: str, amount: int = 1) -> bool:
+    async def remove_item(self, guild_id: int, user_id: int, item_id: str, amount: int = 1) -> bool:
         """Удаляет предмет из инвентаря. Возвращает True если успешно"""
-        try:
-            async with self.conn.execute(
-                "SELECT count FROM inventory WHERE user_id = ? AND item_id = ?",
-                (user_id, item_id)
+        # Проверка и списание в одной операции очереди записи - между ними никто не вклинится
+        async def op(conn):
+            async with conn.execute(
+                "SELECT count FROM inventory WHERE guild_id = ? AND user_id = ? AND item_id = ?",
+                (guild_id, user_id, item_id)
             ) as cursor:
                 result = await cursor.fetchone()
-                
-                if not result or result['count'] < amount:
-                    return False
-                
-                new_count = result['count'] - amount
-                
-                if new_count <= 0:
-                    await self.conn.execute(
-                        "DELETE FROM inventory WHERE user_id = ? AND item_id = ?",
-                        (user_id, item_id)
-                    )
-                else:
-                    await self.conn.execute(
-                        "UPDATE inventory SET count = ? WHERE user_id = ? AND item_id = ?",
-                        (new_count, user_id, item_id)
-                    )
-                
-                await self.conn.commit()
-                return True
+            
+            if not result or result['count'] < amount:
+                return False
+            
+            new_count = result['count'] - amount
+            
+            if new_count <= 0:
+                await conn.execute(
+                    "DELETE FROM inventory WHERE guild_id = ? AND user_id = ? AND item_id = ?",
+                    (guild_id, user_id, item_id)
+                )
+            else:
+                await conn.execute(
+                    "UPDATE inventory SET count = ? WHERE guild_id = ? AND user_id = ? AND item_id = ?",
+                    (new_count, guild_id, user_id, item_id)
+                )
+            return True
+        
+        try:
+            return await self._transaction(op)
         except Exception as e:
             print(f"❌ [Inventory] Ошибка удаления предмета {item_id} у пользователя {user_id}: {e}")
             return False
 
-    async def get_inventory(self, user_id: int) -> List[Dict]:
-        """Получает весь инвентарь пользователя"""
+    async def get_inventory(self, guild_id: int, user_id: int) -> List[Dict]:
+        """Получает весь инвентарь пользователя на сервере"""
         try:
-            async with self.conn.execute(
-                "SELECT item_id, count FROM inventory WHERE user_id = ?",
-                (user_id,)
-            ) as cursor:
-                rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
+            async with self._reader() as conn:
+                async with conn.execute(
+                    "SELECT item_id, count FROM inventory WHERE guild_id = ? AND user_id = ?",
+                    (guild_id, user_id)
+                ) as cursor:
+                    rows = await cursor.fetchall()
+                    return [dict(row) for row in rows]
         except Exception as e:
             print(f"❌ [Inventory] Ошибка получения инвентаря пользователя {user_id}: {e}")
             return []
 
-    async def get_item_count(self, user_id: int, item_id: str) -> int:
+    async def get_item_count(self, guild_id: int, user_id: int, item_id: str) -> int:
         """Получает количество определенного предмета"""
         try:
-            async with self.conn.execute(
-                "SELECT count FROM inventory WHERE user_id = ? AND item_id = ?",
-                (user_id, item_id)
-            ) as cursor:
-                result = await cursor.fetchone()
-                return result['count'] if result else 0
+            async with self._reader() as conn:
+                async with conn.execute(
+                    "SELECT count FROM inventory WHERE guild_id = ? AND user_id = ? AND item_id = ?",
+                    (guild_id, user_id, item_id)
+                ) as cursor:
+                    result = await cursor.fetchone()
+                    return result['count'] if result else 0
         except Exception as e:
             print(f"❌ [Inventory] Ошибка получения количества предмета {item_id}: {e}")
             return 0
@@ -396,48 +1524,49 @@ class Database:
     # ⚠️ СИСТЕМА ПРЕДУПРЕЖДЕНИЙ
     # ==========================================
     
-    async def add_warn(self, user_id: int, admin_id: int, reason: str = "Не указана"):
+    async def add_warn(self, guild_id: int, user_id: int, admin_id: int, reason: str = "Не указана"):
         """Добавляет предупреждение пользователю"""
         try:
-            await self.conn.execute(
-                "INSERT INTO warns (user_id, admin_id, reason) VALUES (?, ?, ?)",
-                (user_id, admin_id, reason)
+            await self._write(
+                "INSERT INTO warns (guild_id, user_id, admin_id, reason) VALUES (?, ?, ?, ?)",
+                (guild_id, user_id, admin_id, reason)
             )
-            await self.conn.commit()
         except Exception as e:
             print(f"❌ [Warns] Ошибка добавления варна пользователю {user_id}: {e}")
 
-    async def get_warns(self, user_id: int) -> List[Dict]:
-        """Получает все предупреждения пользователя"""
+    async def get_warns(self, guild_id: int, user_id: int) -> List[Dict]:
+        """Получает все предупреждения пользователя на сервере"""
         try:
-            async with self.conn.execute(
-                "SELECT * FROM warns WHERE user_id = ? ORDER BY date DESC",
-                (user_id,)
-            ) as cursor:
-                rows = await cursor.fetchall()
-                return [dict(row) for row in rows]
+            async with self._reader() as conn:
+                async with conn.execute(
+                    "SELECT * FROM warns WHERE guild_id = ? AND user_id = ? ORDER BY date DESC",
+                    (guild_id, user_id)
+                ) as cursor:
+                    rows = await cursor.fetchall()
+                    return [dict(row) for row in rows]
         except Exception as e:
             print(f"❌ [Warns] Ошибка получения варнов пользователя {user_id}: {e}")
             return []
 
-    async def remove_warn(self, warn_id: int) -> bool:
-        """Удаляет конкретное предупреждение по ID"""
+    async def remove_warn(self, guild_id: int, warn_id: int) -> bool:
+        """Удаляет конкретное предупреждение по ID (только на своем сервере)"""
         try:
-            cursor = await self.conn.execute(
-                "DELETE FROM warns WHERE id = ?",
-                (warn_id,)
+            deleted = await self._write(
+                "DELETE FROM warns WHERE id = ? AND guild_id = ?",
+                (warn_id, guild_id)
             )
-            await self.conn.commit()
-            return cursor.rowcount > 0
+            return deleted > 0
         except Exception as e:
             print(f"❌ [Warns] Ошибка удаления варна {warn_id}: {e}")
             return False
 
-    async def clear_warns(self, user_id: int):
-        """Очищает все предупреждения пользователя"""
+    async def clear_warns(self, guild_id: int, user_id: int):
+        """Очищает все предупреждения пользователя на сервере"""
         try:
-            await self.conn.execute("DELETE FROM warns WHERE user_id = ?", (user_id,))
-            await self.conn.commit()
+            await self._write(
+                "DELETE FROM warns WHERE guild_id = ? AND user_id = ?",
+                (guild_id, user_id)
+            )
         except Exception as e:
             print(f"❌ [Warns] Ошибка очистки варнов пользователя {user_id}: {e}")
 
@@ -448,69 +1577,91 @@ class Database:
     async def add_event(self, message_id: int, channel_id: int, reward: int, required_users: int):
         """Создает новое событие"""
         try:
-            await self.conn.execute(
-                "INSERT INTO active_events (message_id, channel_id, reward, required_users, users_list) VALUES (?, ?, ?, ?, ?)",
-                (message_id, channel_id, reward, required_users, '[]')
+            await self._write(
+                "INSERT INTO active_events (message_id, channel_id, reward, required_users) VALUES (?, ?, ?, ?)",
+                (message_id, channel_id, reward, required_users)
             )
-            await self.conn.commit()
         except Exception as e:
             print(f"❌ [Events] Ошибка создания события {message_id}: {e}")
 
     async def get_event(self, message_id: int) -> Optional[Dict]:
-        """Получает данные события"""
+        """Получает данные события; participants - число участников"""
         try:
             async with self.conn.execute(
-                "SELECT * FROM active_events WHERE message_id = ?",
+                """SELECT e.*, (SELECT COUNT(*) FROM event_participants p WHERE p.message_id = e.message_id)
+                   AS participants FROM active_events e WHERE e.message_id = ?""",
                 (message_id,)
             ) as cursor:
                 row = await cursor.fetchone()
-                if row:
-                    data = dict(row)
-                    data['users_list'] = json.loads(data['users_list'])
-                    return data
-                return None
+                return dict(row) if row else None
         except Exception as e:
             print(f"❌ [Events] Ошибка получения события {message_id}: {e}")
             return None
 
+    async def get_event_participants(self, message_id: int) -> List[int]:
+        """Список ID участников события"""
+        try:
+            async with self.conn.execute(
+                "SELECT user_id FROM event_participants WHERE message_id = ?",
+                (message_id,)
+            ) as cursor:
+                return [row['user_id'] for row in await cursor.fetchall()]
+        except Exception as e:
+            print(f"❌ [Events] Ошибка получения участников события {message_id}: {e}")
+            return []
+
+    async def count_event_participants(self, message_id: int) -> int:
+        """Число участников события (COUNT по первичному ключу event_participants)"""
+        try:
+            async with self.conn.execute(
+                "SELECT COUNT(*) FROM event_participants WHERE message_id = ?",
+                (message_id,)
+            ) as cursor:
+                row = await cursor.fetchone()
+                return row[0]
+        except Exception as e:
+            print(f"❌ [Events] Ошибка подсчета участников события {message_id}: {e}")
+            return 0
+
     async def add_event_participant(self, message_id: int, user_id: int) -> bool:
-        """Добавляет участника в событие. Возвращает True если успешно"""
+        """Добавляет участника в событие. Возвращает True, если он вступил впервые"""
         try:
-            event = await self.get_event(message_id)
-            if not event:
-                return False
-            
-            users = event['users_list']
-            if user_id in users:
-                return False
-            
-            users.append(user_id)
-            await self.conn.execute(
-                "UPDATE active_events SET users_list = ? WHERE message_id = ?",
-                (json.dumps(users), message_id)
+            # Одна вставка: повторный клик упирается в первичный ключ, гонки нет
+            added = await self._write(
+                """INSERT OR IGNORE INTO event_participants (message_id, user_id)
+                   SELECT ?, ? WHERE EXISTS (SELECT 1 FROM active_events WHERE message_id = ?)""",
+                (message_id, user_id, message_id)
             )
-            await self.conn.commit()
-            return True
+            return added == 1
         except Exception as e:
             print(f"❌ [Events] Ошибка добавления участника в событие {message_id}: {e}")
             return False
 
     async def remove_event(self, message_id: int):
-        """Удаляет событие"""
+        """Удаляет событие вместе с участниками"""
+        async def op(conn):
+            await conn.execute("DELETE FROM event_participants WHERE message_id = ?", (message_id,))
+            await conn.execute("DELETE FROM active_events WHERE message_id = ?", (message_id,))
+        
         try:
-            await self.conn.execute("DELETE FROM active_events WHERE message_id = ?", (message_id,))
-            await self.conn.commit()
+            await self._transaction(op)
         except Exception as e:
             print(f"❌ [Events] Ошибка удаления события {message_id}: {e}")
 
     async def cleanup_old_events(self, days: int = 7):
-        """Удаляет старые события"""
-        try:
-            await self.conn.execute(
+        """Удаляет старые события и их участников"""
+        async def op(conn):
+            await conn.execute(
                 "DELETE FROM active_events WHERE created_at < datetime('now', ?)",
                 (f'-{days} days',)
             )
-            await self.conn.commit()
+            await conn.execute(
+                """DELETE FROM event_participants
+                   WHERE message_id NOT IN (SELECT message_id FROM active_events)"""
+            )
+        
+        try:
+            await self._transaction(op)
         except Exception as e:
             print(f"❌ [Events] Ошибка очистки старых событий: {e}")
 
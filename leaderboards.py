@@ -0,0 +1,74 @@
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import discord
+from database import db
+from config import Config
+
+class LeaderboardService:
+    """Таблицы лидеров в памяти: топ-N и готовые embed без SQL на каждый вызов"""
+
+    # Таблица -> (колонки users, от которых она зависит, метод выборки)
+    BOARDS = {
+        "level": (("level", "xp", "coins"), db.get_top_users),
+        "invites": (("invites",), db.get_top_inviters),
+    }
+
+    def __init__(self, size: int = Config.LEADERBOARD_SIZE, ttl: float = Config.LEADERBOARD_TTL):
+        self.size = size
+        self.ttl = ttl
+        # (board, guild_id) -> (время сборки, версии колонок, строки)
+        self._boards: Dict[tuple, tuple] = {}
+        # (key, guild_id) -> (строки, по которым собран embed, embed)
+        self._embeds: Dict[tuple, tuple] = {}
+
+    async def get_rows(self, board: str, guild_id: int) -> List[Dict]:
+        """
+        Возвращает топ сервера из памяти.
+        Перечитывает БД, только если колонки менялись и прошло не меньше ttl секунд.
+        """
+        columns, fetch = self.BOARDS[board]
+        versions = db.get_column_versions(guild_id, columns)
+        now = time.monotonic()
+
+        cached = self._boards.get((board, guild_id))
+        if cached is not None:
+            built_at, built_versions, rows = cached
+            if built_versions == versions or now - built_at < self.ttl:
+                return rows
+
+        rows = await fetch(guild_id, limit=self.size)
+        self._boards[(board, guild_id)] = (now, versions, rows)
+        return rows
+
+    async def get_embed(self, board: str, guild_id: int, key: str,
+                        render: Callable[[List[Dict]], discord.Embed]) -> discord.Embed:
+        """Возвращает embed из кэша, пересобирая его только при обновлении топа"""
+        rows = await self.get_rows(board, guild_id)
+
+        cached = self._embeds.get((key, guild_id))
+        if cached is not None and cached[0] is rows:
+            embed = cached[1]
+        else:
+            embed = render(rows)
+            self._embeds[(key, guild_id)] = (rows, embed)
+
+        # Время в embed (например, из EmbedBuilder) - время показа, а не сборки кэша
+        if embed.timestamp is not None:
+            embed.timestamp = datetime.utcnow()
+        return embed
+
+    def invalidate(self, board: Optional[str] = None, guild_id: Optional[int] = None):
+        """
+        Сбрасывает кэш таблицы (или всех таблиц) на сервере или на всех серверах.
+        Нужен для правок админа, которые должны попасть в топ сразу, без ожидания ttl.
+        """
+        for cached_board, cached_guild in list(self._boards):
+            if board is not None and cached_board != board:
+                continue
+            if guild_id is not None and cached_guild != guild_id:
+                continue
+            del self._boards[(cached_board, cached_guild)]
+
+# Глобальный сервис таблиц лидеров
+leaderboards = LeaderboardService()
@@ -3,9 +3,10 @@ from discord.ext import commands
 import asyncio
 import os
 import sys
+import time
 from database import db
 from config import Config
-from utils import EmbedBuilder
+from utils import EmbedBuilder, MessageInfo
 import logging
 
 # Настройка логирования
@@ -19,6 +20,60 @@ logging.basicConfig(
 )
 logger = logging.getLogger('DiscordBot')
 
+class MessagePipeline:
+    """
+    Конвейер обработки сообщений с фиксированным порядком стадий.
+    Обработчик возвращает True, чтобы остановить сообщение на своей стадии.
+    """
+    
+    STAGES = ("filter", "moderate", "reward")
+    
+    def __init__(self):
+        self.handlers = {stage: [] for stage in self.STAGES}
+        # stage -> [вызовов, суммарное время в секундах]
+        self.stats = {stage: [0, 0.0] for stage in self.STAGES}
+    
+    def register(self, stage: str, name: str, handler):
+        """Добавляет обработчик в стадию (повторная регистрация заменяет старый)"""
+        if stage not in self.handlers:
+            raise ValueError(f"Неизвестная стадия: {stage}")
+        self.unregister(name)
+        self.handlers[stage].append((name, handler))
+    
+    def unregister(self, name: str):
+        """Убирает обработчик из всех стадий"""
+        for stage in self.STAGES:
+            self.handlers[stage] = [h for h in self.handlers[stage] if h[0] != name]
+    
+    async def run(self, info: MessageInfo) -> bool:
+        """Прогоняет сообщение по стадиям. Возвращает True, если оно было остановлено"""
+        for stage in self.STAGES:
+            handlers = self.handlers[stage]
+            if not handlers:
+                continue
+            
+            started = time.perf_counter()
+            try:
+                for name, handler in handlers:
+                    try:
+                        if await handler(info):
+                            info.stopped_at = stage
+                            return True
+                    except Exception as e:
+                        logger.error(f"❌ Ошибка обработчика {name} ({stage}): {e}", exc_info=True)
+            finally:
+                stat = self.stats[stage]
+                stat[0] += 1
+                stat[1] += time.perf_counter() - started
+        return False
+    
+    def get_stats(self) -> dict:
+        """Среднее время каждой стадии в миллисекундах"""
+        return {
+            stage: {"calls": calls, "avg_ms": total / calls * 1000 if calls else 0.0}
+            for stage, (calls, total) in self.stats.items()
+        }
+
 class DiscordBot(commands.Bot):
     """Основной класс бота с расширенным функционалом"""
     
@@ -30,10 +85,13 @@ class DiscordBot(commands.Bot):
             command_prefix=Config.PREFIX,
             intents=intents,
             help_command=None,  # Отключаем стандартную команду help
+            owner_id=Config.OWNER_ID,  # None - владелец берется из приложения Discord
             case_insensitive=True  # Команды не зависят от регистра
         )
         
         self.logger = logger
+        self.pipeline = MessagePipeline()
+        self.pipeline.register("filter", "core", self.filter_message)
     
     async def setup_hook(self):
         """Вызывается при запуске бота для инициализации"""
@@ -91,6 +149,30 @@ class DiscordBot(commands.Bot):
             status=discord.Status.online
         )
     
+    async def on_message(self, message: discord.Message):
+        """
+        Разбирает сообщение один раз и прогоняет его по конвейеру
+        (filter -> moderate -> reward), затем вызывает команду без повторного get_context
+        """
+        info = await self.preprocess_message(message)
+        await self.pipeline.run(info)
+        
+        # Удаленное модерацией сообщение команду не вызывает; в ЛС команд нет - все данные привязаны к серверу
+        if info.ctx is not None and info.stopped_at not in ("filter", "moderate"):
+            await self.invoke(info.ctx)
+    
+    async def filter_message(self, info: MessageInfo) -> bool:
+        """Стадия filter: боты и личные сообщения дальше не идут"""
+        return info.is_bot or info.guild is None
+    
+    async def preprocess_message(self, message: discord.Message) -> MessageInfo:
+        """Определяет префикс/команду и флаги автора"""
+        ctx = None
+        # Сообщения ботов команды не вызывают, префикс для них не разбираем
+        if not message.author.bot:
+            ctx = await self.get_context(message)
+        return MessageInfo(message, ctx)
+    
     async def on_command_error(self, ctx, error):
         """Глобальный обработчик ошибок команд"""
         # Игнорируем ошибки, которые уже обработаны
@@ -113,6 +195,14 @@ class DiscordBot(commands.Bot):
             )
             await ctx.send(embed=embed, delete_after=10)
         
+        # Команда только для владельца бота
+        elif isinstance(error, commands.NotOwner):
+            embed = EmbedBuilder.error(
+                "Недостаточно прав",
+                "Эта команда доступна только владельцу бота"
+            )
+            await ctx.send(embed=embed, delete_after=10)
+        
         # Команда на кулдауне
         elif isinstance(error, commands.CommandOnCooldown):
             embed = EmbedBuilder.warning(
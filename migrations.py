@@ -0,0 +1,301 @@
+"""
+Версионные миграции схемы БД.
+Номер схемы хранится в PRAGMA user_version. При старте применяются только шаги
+с номером больше текущего - все сразу, одной транзакцией. Если схема актуальна,
+никакой DDL не выполняется.
+
+Новый шаг - функция async (conn) в конце MIGRATIONS. Уже выпущенные шаги не меняются.
+"""
+
+import json
+from typing import Awaitable, Callable, List, Tuple
+import aiosqlite
+from config import Config
+
+# ==========================================
+# 1: СХЕМА С РАЗДЕЛЕНИЕМ ПО СЕРВЕРАМ
+# ==========================================
+
+# Таблицы, которые до разделения по серверам не имели guild_id:
+# таблица -> (колонки старой таблицы, переносимые в новую вместе с guild_id)
+GUILD_SCOPED_TABLES = {
+    "users": "user_id, xp, level, coins, invites, created_at",
+    "inventory": "user_id, item_id, count",
+    "warns": "id, user_id, admin_id, reason, date",
+    "server_settings": "key, value, updated_at",
+    "transactions": "id, user_id, amount, reason, counterparty, created_at",
+    "balance_snapshots": "user_id, coins, ledger_id, created_at",
+    "cooldowns": "user_id, action, expires_at",
+}
+
+async def _table_columns(conn: aiosqlite.Connection, table: str) -> List[str]:
+    async with conn.execute(f"PRAGMA table_info({table})") as cursor:
+        return [row[1] for row in await cursor.fetchall()]
+
+async def _guild_schema(conn: aiosqlite.Connection):
+    """
+    Базовая схема. Базы без user_version создавались через CREATE TABLE IF NOT EXISTS,
+    поэтому шаг допускает уже существующие таблицы, а таблицы без guild_id
+    переносит на сервер Config.PRIMARY_GUILD_ID.
+    """
+    legacy = []
+    for table in GUILD_SCOPED_TABLES:
+        columns = await _table_columns(conn, table)
+        if columns and "guild_id" not in columns:
+            legacy.append(table)
+    if legacy and not Config.PRIMARY_GUILD_ID:
+        # Без сервера данные ушли бы на guild_id = 0, где их не увидит ни один сервер
+        raise RuntimeError(
+            f"В БД есть данные без разделения по серверам ({', '.join(legacy)}), "
+            "но PRIMARY_GUILD_ID не задан. Укажите в .env ID сервера, которому они принадлежат "
+            "(PRIMARY_GUILD_ID=...), и перезапустите бота. База не изменена."
+        )
+    # Старые индексы переезжают вместе с таблицами и удалятся вместе с ними
+    for table in legacy:
+        await conn.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+
+    # --- ПОЛЬЗОВАТЕЛИ И ЭКОНОМИКА (отдельно для каждого сервера) ---
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            xp INTEGER DEFAULT 0,
+            level INTEGER DEFAULT 1,
+            coins INTEGER DEFAULT 0,
+            invites INTEGER DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (guild_id, user_id)
+        ) WITHOUT ROWID
+    """)
+
+    # --- ЖУРНАЛ ТРАНЗАКЦИЙ (только добавление) ---
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY,
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            amount INTEGER NOT NULL,
+            reason TEXT NOT NULL,
+            counterparty INTEGER,
+            created_at REAL NOT NULL
+        )
+    """)
+
+    # --- СНИМКИ БАЛАНСОВ (баланс на момент транзакции ledger_id) ---
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS balance_snapshots (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            coins INTEGER NOT NULL,
+            ledger_id INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            PRIMARY KEY (guild_id, user_id)
+        ) WITHOUT ROWID
+    """)
+
+    # --- ИНВЕНТАРЬ ---
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS inventory (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            item_id TEXT NOT NULL,
+            count INTEGER DEFAULT 1,
+            PRIMARY KEY (guild_id, user_id, item_id),
+            FOREIGN KEY (guild_id, user_id) REFERENCES users(guild_id, user_id) ON DELETE CASCADE
+        ) WITHOUT ROWID
+    """)
+
+    # --- ПРЕДУПРЕЖДЕНИЯ ---
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS warns (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            admin_id INTEGER NOT NULL,
+            reason TEXT,
+            date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (guild_id, user_id) REFERENCES users(guild_id, user_id) ON DELETE CASCADE
+        )
+    """)
+
+    # --- АКТИВНЫЕ СОБЫТИЯ ---
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS active_events (
+            message_id INTEGER PRIMARY KEY,
+            channel_id INTEGER NOT NULL,
+            reward INTEGER DEFAULT 0,
+            required_users INTEGER DEFAULT 1,
+            users_list TEXT DEFAULT '[]',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # --- НАСТРОЙКИ СЕРВЕРА (Key-Value хранилище) ---
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS server_settings (
+            guild_id INTEGER NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (guild_id, key)
+        ) WITHOUT ROWID
+    """)
+
+    # --- КУЛДАУНЫ КОМАНД (переживают перезапуск) ---
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS cooldowns (
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            expires_at REAL NOT NULL,
+            PRIMARY KEY (guild_id, user_id, action)
+        ) WITHOUT ROWID
+    """)
+
+    # --- ПРАВИЛА АВТОМОДЕРАЦИИ ---
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS automod_settings (
+            guild_id INTEGER NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            PRIMARY KEY (guild_id, key)
+        )
+    """)
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS automod_words (
+            guild_id INTEGER NOT NULL,
+            word TEXT NOT NULL,
+            PRIMARY KEY (guild_id, word)
+        )
+    """)
+
+    # --- ПРИВАТНЫЕ ГОЛОСОВЫЕ КАНАЛЫ ---
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS voice_channels (
+            channel_id INTEGER PRIMARY KEY,
+            owner_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Индексы для ускорения запросов.
+    # users - WITHOUT ROWID, поэтому каждый индекс несет (guild_id, user_id)
+    # и топы/места читаются только из индекса, без обращения к таблице
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_guild_level ON users(guild_id, level DESC, xp DESC, coins)"
+    )
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_guild_invites ON users(guild_id, invites DESC)"
+    )
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_warns_guild_user ON warns(guild_id, user_id)")
+    await conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_transactions_guild_user ON transactions(guild_id, user_id, id)"
+    )
+    await conn.execute("CREATE INDEX IF NOT EXISTS idx_voice_owner ON voice_channels(owner_id)")
+
+    if legacy:
+        guild_id = Config.PRIMARY_GUILD_ID
+        for table in legacy:
+            columns = GUILD_SCOPED_TABLES[table]
+            await conn.execute(
+                f"INSERT INTO {table} (guild_id, {columns}) SELECT ?, {columns} FROM {table}_legacy",
+                (guild_id,)
+            )
+            await conn.execute(f"DROP TABLE {table}_legacy")
+        print(f"✅ [Migrations] Данные {', '.join(legacy)} перенесены на сервер {guild_id}.")
+
+# ==========================================
+# 2: УЧАСТНИКИ СОБЫТИЙ ОТДЕЛЬНОЙ ТАБЛИЦЕЙ
+# ==========================================
+
+async def _event_participants(conn: aiosqlite.Connection):
+    """
+    Участники событий вместо JSON-списка active_events.users_list:
+    вступление - один INSERT OR IGNORE, количество - COUNT по первичному ключу.
+    """
+    await conn.execute("""
+        CREATE TABLE event_participants (
+            message_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            PRIMARY KEY (message_id, user_id)
+        ) WITHOUT ROWID
+    """)
+
+    async with conn.execute("SELECT message_id, users_list FROM active_events") as cursor:
+        events = await cursor.fetchall()
+    rows = []
+    for message_id, users_list in events:
+        try:
+            users = json.loads(users_list or "[]")
+        except ValueError:
+            users = []
+        rows.extend({(message_id, int(user_id)) for user_id in users})
+    if rows:
+        await conn.executemany(
+            "INSERT OR IGNORE INTO event_participants (message_id, user_id) VALUES (?, ?)", rows
+        )
+
+    # Убираем колонку users_list (DROP COLUMN есть не во всех сборках SQLite - пересоздаем таблицу)
+    await conn.execute("""
+        CREATE TABLE active_events_new (
+            message_id INTEGER PRIMARY KEY,
+            channel_id INTEGER NOT NULL,
+            reward INTEGER DEFAULT 0,
+            required_users INTEGER DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    await conn.execute("""
+        INSERT INTO active_events_new (message_id, channel_id, reward, required_users, created_at)
+        SELECT message_id, channel_id, reward, required_users, created_at FROM active_events
+    """)
+    await conn.execute("DROP TABLE active_events")
+    await conn.execute("ALTER TABLE active_events_new RENAME TO active_events")
+    if rows:
+        print(f"✅ [Migrations] Перенесено {len(rows)} участников событий из users_list.")
+
+# ==========================================
+# 📋 СПИСОК МИГРАЦИЙ
+# ==========================================
+
+# (версия схемы после шага, описание, шаг). Версии идут подряд с 1
+MIGRATIONS: List[Tuple[int, str, Callable[[aiosqlite.Connection], Awaitable[None]]]] = [
+    (1, "схема с разделением по серверам", _guild_schema),
+    (2, "участники событий в event_participants", _event_participants),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+async def get_version(conn: aiosqlite.Connection) -> int:
+    async with conn.execute("PRAGMA user_version") as cursor:
+        row = await cursor.fetchone()
+    return row[0]
+
+async def migrate(conn: aiosqlite.Connection) -> int:
+    """
+    Доводит схему до LATEST_VERSION и возвращает итоговую версию.
+    Все шаги и новый user_version фиксируются одним commit; при ошибке база остается как была.
+    """
+    version = await get_version(conn)
+    if version > LATEST_VERSION:
+        raise RuntimeError(
+            f"Схема БД версии {version} новее, чем знает бот ({LATEST_VERSION}). Обновите код бота."
+        )
+
+    pending = [step for step in MIGRATIONS if step[0] > version]
+    if not pending:
+        return version
+
+    # IMMEDIATE: сразу берем блокировку записи, чтобы второй процесс не начал ту же миграцию
+    await conn.execute("BEGIN IMMEDIATE")
+    try:
+        for target, description, apply in pending:
+            await apply(conn)
+            print(f"✅ [Migrations] {version} -> {target}: {description}")
+            version = target
+        await conn.execute(f"PRAGMA user_version = {int(version)}")
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+    return version
@@ -0,0 +1,23 @@
+import asyncio
+
+import pytest
+
+from database import Database
+
+
+@pytest.fixture
+def run_db(tmp_path, monkeypatch):
+    """Запускает корутину scenario(db) на свежей БД во временной папке"""
+    monkeypatch.chdir(tmp_path)
+
+    def run(scenario):
+        async def main():
+            db = Database()
+            await db.connect()
+            try:
+                return await scenario(db)
+            finally:
+                await db.close()
+        return asyncio.run(main())
+
+    return run
@@ -0,0 +1,48 @@
+import asyncio
+from types import SimpleNamespace
+
+from cogs.automod import AutoMod, AutoModRules
+
+
+class FakeActions:
+    def __init__(self):
+        self.reasons = []
+
+    def enqueue(self, message, reason):
+        self.reasons.append(reason)
+
+
+def make_automod():
+    cog = AutoMod.__new__(AutoMod)
+    cog.fingerprints = {}
+    cog.fingerprint_log = {}
+    cog.actions = FakeActions()
+    return cog
+
+
+def message(content, user_id, channel_id=1):
+    return SimpleNamespace(
+        content=content,
+        guild=SimpleNamespace(id=1),
+        author=SimpleNamespace(id=user_id),
+        channel=SimpleNamespace(id=channel_id)
+    )
+
+
+def send_from_users(cog, content, users):
+    rules = AutoModRules()
+    return [asyncio.run(cog.check_duplicates(message(content, user_id), rules)) for user_id in range(users)]
+
+
+def test_common_phrases_are_not_a_raid():
+    cog = make_automod()
+    for phrase in ("С днем рождения!", "спокойной ночи", "gg well played", "ахахахахахахахахахахаха"):
+        assert not any(send_from_users(cog, phrase, 6)), phrase
+    assert cog.actions.reasons == []
+
+
+def test_copypasta_raid_detected():
+    cog = make_automod()
+    results = send_from_users(cog, "Заходите на наш сервер, там раздают бесплатный нитро!", 4)
+    assert results == [False, False, False, True]
+    assert cog.actions.reasons == ["Повторяющиеся сообщения"]
@@ -0,0 +1,49 @@
+import pytest
+
+from config import Config
+
+
+def level_from_xp_loop(xp: int) -> int:
+    """Прежняя реализация get_level_from_xp: перебор уровней"""
+    level = 1
+    total_xp = 0
+    while total_xp <= xp:
+        total_xp += Config.get_xp_for_level(level)
+        if total_xp > xp:
+            break
+        level += 1
+    return level
+
+
+def total_xp_for_level_loop(level: int) -> int:
+    return sum(Config.get_xp_for_level(l) for l in range(1, level))
+
+
+def test_level_from_xp_matches_loop():
+    for xp in range(0, 200_000, 7):
+        assert Config.get_level_from_xp(xp) == level_from_xp_loop(xp), xp
+
+
+@pytest.mark.parametrize("xp", [0, -1, -100, -10**18])
+def test_level_from_xp_non_positive(xp):
+    assert Config.get_level_from_xp(xp) == level_from_xp_loop(xp) == 1
+
+
+def test_level_from_xp_at_level_boundaries():
+    for level in range(1, 2000):
+        start = Config.get_total_xp_for_level(level)
+        assert Config.get_level_from_xp(start) == level
+        if level > 1:
+            assert Config.get_level_from_xp(start - 1) == level - 1
+
+
+def test_total_xp_for_level_matches_loop():
+    for level in range(-5, 500):
+        assert Config.get_total_xp_for_level(level) == total_xp_for_level_loop(level), level
+
+
+@pytest.mark.parametrize("xp", [10**12, 10**18 + 12345, 2**63 - 1, 10**40])
+def test_level_from_xp_large(xp):
+    # Перебор здесь слишком долгий: проверяем, что xp попадает в границы найденного уровня
+    level = Config.get_level_from_xp(xp)
+    assert Config.get_total_xp_for_level(level) <= xp < Config.get_total_xp_for_level(level + 1)
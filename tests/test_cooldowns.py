@@ -0,0 +1,63 @@
+import pytest
+
+import utils
+from utils import CooldownManager
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(utils.time, "monotonic", clock)
+    return clock
+
+
+def test_rearming_keeps_heap_bounded(clock):
+    manager = CooldownManager()
+    users = 100
+    for _ in range(500):
+        for user_id in range(users):
+            manager.set_cooldown(user_id, "xp_gain", 60, guild_id=1)
+            assert manager.is_on_cooldown(user_id, "xp_gain", 1)
+        clock.now += 1
+        assert len(manager.cooldowns) == users
+        assert len(manager._heap) <= 2 * users + 64 + 1
+
+
+def test_expired_entries_are_evicted(clock):
+    manager = CooldownManager()
+    for user_id in range(1000):
+        manager.set_cooldown(user_id, "daily", 10)
+    clock.now += 11
+    assert not manager.is_on_cooldown(5, "daily")
+    assert manager.get_remaining(5, "daily") == 0
+    manager.set_cooldown(1, "daily", 10)
+    assert len(manager.cooldowns) == 1
+    assert len(manager) == 1
+
+
+def test_extended_cooldown_survives_stale_heap_entry(clock):
+    manager = CooldownManager()
+    manager.set_cooldown(1, "work", 10)
+    manager.set_cooldown(1, "work", 100)
+    clock.now += 50
+    manager.set_cooldown(2, "work", 10)
+    assert manager.is_on_cooldown(1, "work")
+    assert manager.get_remaining(1, "work") == 50
+
+
+def test_guilds_are_separate(clock):
+    manager = CooldownManager()
+    manager.set_cooldown(1, "xp_gain", 60, guild_id=10)
+    assert manager.is_on_cooldown(1, "xp_gain", 10)
+    assert not manager.is_on_cooldown(1, "xp_gain", 20)
+    assert not manager.is_on_cooldown(1, "xp_gain")
+    manager.clear_cooldown(1, "xp_gain", 10)
+    assert not manager.is_on_cooldown(1, "xp_gain", 10)
@@ -0,0 +1,23 @@
+import asyncio
+
+from database import Database
+
+
+def test_database_created_outside_event_loop(tmp_path, monkeypatch):
+    # Глобальный db создается при импорте, до asyncio.run (до Python 3.10 Event привязывался к циклу)
+    monkeypatch.chdir(tmp_path)
+    db = Database()
+
+    async def session(amount):
+        await db.connect()
+        try:
+            await db.add_coins(1, 1, amount, "test")
+            db.queue_user_delta(1, 1, xp=amount)
+            await db.flush_pending()
+            return (await db.get_user(1, 1))["coins"]
+        finally:
+            await db.close()
+
+    # Повторный запуск на новом цикле тоже должен работать
+    assert asyncio.run(asyncio.wait_for(session(10), timeout=10)) == 10
+    assert asyncio.run(asyncio.wait_for(session(5), timeout=10)) == 15
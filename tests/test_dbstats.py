@@ -0,0 +1,51 @@
+from types import SimpleNamespace
+
+import cogs.backup
+from cogs.backup import Backup
+
+
+class FakePipeline:
+    def get_stats(self):
+        return {"reward": {"calls": 3, "avg_ms": 0.5}}
+
+
+def test_write_queue_stats(run_db):
+    async def scenario(db):
+        await db.add_coins(1, 1, 10)
+        return db.writes.stats()
+
+    stats = run_db(scenario)
+    assert stats["batches"] >= 1
+    assert stats["operations"] >= 1
+    assert stats["depth"] == 0
+
+
+def test_dbstats_embed(run_db, monkeypatch):
+    async def scenario(db):
+        monkeypatch.setattr(cogs.backup, "db", db)
+        db.query_stats.reset()
+        await db.add_coins(1, 1, 10)
+        await db.get_user(1, 1)
+        cog = SimpleNamespace(bot=SimpleNamespace(pipeline=FakePipeline()))
+        return Backup.build_stats_embed(cog, limit=5)
+
+    embed = run_db(scenario)
+    fields = {field.name: field.value for field in embed.fields}
+    assert "WriteQueue.commit" in fields["⏱️ Запросы по методам (мс)"]
+    assert "Пачек:" in fields["✍️ Очередь записи"]
+    assert "Промахов:" in fields["👤 Кэш пользователей"]
+    assert "reward" in fields["📨 Конвейер сообщений"]
+
+
+def test_write_ops_named_by_method(run_db):
+    # Имена не должны зависеть от co_qualname (его нет до Python 3.11)
+    async def scenario(db):
+        db.query_stats.reset()
+        await db.add_item(1, 1, "apple", 2)
+        await db.remove_item(1, 1, "apple")
+        await db.update_user(1, 1, xp=10)
+        return {item["method"] for item in db.query_stats.stats()}
+
+    methods = run_db(scenario)
+    assert {"add_item", "remove_item", "update_user"} <= methods
+    assert "op" not in methods
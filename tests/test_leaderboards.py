@@ -0,0 +1,27 @@
+import asyncio
+from datetime import datetime, timezone
+
+from leaderboards import LeaderboardService
+from utils import EmbedBuilder
+
+
+def test_cached_embed_timestamp_is_refreshed():
+    service = LeaderboardService()
+    rows = []
+
+    async def get_rows(board, guild_id):
+        return rows
+    service.get_rows = get_rows
+    rendered = []
+
+    def render(top):
+        rendered.append(top)
+        return EmbedBuilder.info("Таблица лидеров", "Пока никого нет в топе")
+
+    stale = datetime(2000, 1, 1, tzinfo=timezone.utc)
+    embed = asyncio.run(service.get_embed("level", 1, "levels", render))
+    embed.timestamp = stale
+
+    embed = asyncio.run(service.get_embed("level", 1, "levels", render))
+    assert len(rendered) == 1
+    assert embed.timestamp > stale
@@ -0,0 +1,70 @@
+import asyncio
+
+from database import InsufficientFunds
+
+
+def test_rebuild_matches_balance_after_clamped_debit(run_db):
+    async def scenario(db):
+        await db.add_coins(1, 1, 30, "test")
+        await db.add_coins(1, 1, -100, "test")
+        after_debit = ((await db.get_user(1, 1))["coins"], await db.rebuild_balance(1, 1))
+
+        await db.add_coins(1, 2, 100, "test")
+        assert await db.transfer_coins(1, 2, 1, 60)
+        after_transfer = ((await db.get_user(1, 1))["coins"], await db.rebuild_balance(1, 1))
+        return after_debit, after_transfer
+
+    after_debit, after_transfer = run_db(scenario)
+    assert after_debit == (0, 0)
+    assert after_transfer == (60, 60)
+
+
+def test_rebuild_matches_balance_for_queued_deltas(run_db):
+    async def scenario(db):
+        db.queue_user_delta(1, 1, coins=30, reason="test")
+        db.queue_user_delta(1, 1, coins=-100, reason="test")
+        db.queue_user_delta(1, 1, coins=60, reason="test")
+        await db.flush_pending()
+        db.user_cache.invalidate((1, 1))
+        return (await db.get_user(1, 1))["coins"], await db.rebuild_balance(1, 1)
+
+    # Каждая строка применяется по порядку: 30 -> 0 -> 60
+    assert run_db(scenario) == (60, 60)
+
+
+def test_bulk_add_coins_records_applied_amounts(run_db):
+    async def scenario(db):
+        await db.bulk_add_coins(1, [(1, 50), (2, 10)], "test")
+        await db.bulk_add_coins(1, [(1, -20), (2, -40)], "test")
+        return [((await db.get_user(1, u))["coins"], await db.rebuild_balance(1, u)) for u in (1, 2)]
+
+    assert run_db(scenario) == [(30, 30), (0, 0)]
+
+
+def test_spend_coins_is_atomic(run_db):
+    async def scenario(db):
+        await db.add_coins(1, 1, 100, "test")
+        results = await asyncio.gather(
+            *[db.spend_coins(1, 1, 60, "test:bet") for _ in range(3)], return_exceptions=True
+        )
+        return results, (await db.get_user(1, 1))["coins"], await db.rebuild_balance(1, 1)
+
+    results, coins, rebuilt = run_db(scenario)
+    assert results.count(True) == 1
+    refused = [r for r in results if isinstance(r, InsufficientFunds)]
+    assert len(refused) == 2 and all(r.needed == 20 for r in refused)
+    assert coins == rebuilt == 40
+
+
+def test_transfer_reports_shortfall(run_db):
+    async def scenario(db):
+        await db.add_coins(1, 1, 30, "test")
+        try:
+            await db.transfer_coins(1, 1, 2, 100)
+        except InsufficientFunds as e:
+            shortfall = e.needed
+        else:
+            shortfall = None
+        return shortfall, await db.transfer_coins(1, 1, 1, 10), (await db.get_user(1, 1))["coins"]
+
+    assert run_db(scenario) == (70, False, 30)
@@ -2,7 +2,10 @@ import discord
 from discord.ext import commands
 from typing import Optional, Union
 from config import Config
+from database import db
 import asyncio
+import heapq
+import time
 from datetime import datetime
 
 class EmbedBuilder:
@@ -56,6 +59,24 @@ class EmbedBuilder:
         embed.timestamp = datetime.utcnow()
         return embed
 
+class MessageInfo:
+    """Результат однократного разбора сообщения, общий для всех обработчиков"""
+    
+    __slots__ = ("message", "ctx", "guild", "is_bot", "is_command", "is_admin", "stopped_at")
+    
+    def __init__(self, message: discord.Message, ctx: Optional[commands.Context] = None):
+        self.message = message
+        self.ctx = ctx
+        self.guild = message.guild
+        self.is_bot = message.author.bot
+        self.is_command = ctx is not None and ctx.valid
+        self.is_admin = (
+            isinstance(message.author, discord.Member)
+            and message.author.guild_permissions.administrator
+        )
+        # Стадия конвейера, на которой сообщение было остановлено
+        self.stopped_at: Optional[str] = None
+
 class Checks:
     """Кастомные проверки для команд"""
     
@@ -73,6 +94,22 @@ class Checks:
             return ctx.author.guild_permissions.manage_messages or ctx.author.guild_permissions.administrator
         return commands.check(predicate)
     
+    @staticmethod
+    def persistent_cooldown(action: str, seconds: int):
+        """
+        Кулдаун, который хранится в БД и переживает перезапуск бота.
+        Как и commands.cooldown, расходуется в момент прохождения проверки.
+        """
+        async def predicate(ctx):
+            retry_after = db.get_cooldown(ctx.guild.id, ctx.author.id, action)
+            if retry_after > 0:
+                raise commands.CommandOnCooldown(
+                    commands.Cooldown(1, seconds), retry_after, commands.BucketType.user
+                )
+            await db.set_cooldown(ctx.guild.id, ctx.author.id, action, seconds)
+            return True
+        return commands.check(predicate)
+    
     @staticmethod
     def is_owner():
         """Проверяет, является ли пользователь владельцем бота"""
@@ -259,37 +296,65 @@ def get_progress_bar(current: int, maximum: int, length: int = 10) -> str:
     return f"[{bar}] {percent}%"
 
 class CooldownManager:
-    """Менеджер кулдаунов для предотвращения спама"""
+    """
+    Менеджер кулдаунов для предотвращения спама.
+    Сроки хранятся по монотонным часам, истекшие записи вычищаются
+    через min-кучу по времени истечения, так что словарь не растет бесконечно.
+    """
     
     def __init__(self):
+        # (guild_id, user_id, action) -> момент истечения по time.monotonic()
+        # guild_id = 0 - кулдаун общий для всех серверов
         self.cooldowns = {}
+        # Куча (момент истечения, ключ); устаревшие элементы удаляются лениво
+        self._heap = []
+    
+    def __len__(self) -> int:
+        self._purge(time.monotonic())
+        return len(self.cooldowns)
+    
+    def _purge(self, now: float):
+        """Удаляет истекшие кулдауны с вершины кучи"""
+        heap, cooldowns = self._heap, self.cooldowns
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            # Запись могли продлить или очистить - тогда элемент кучи устарел
+            if cooldowns.get(key) == expires_at:
+                del cooldowns[key]
     
-    def is_on_cooldown(self, user_id: int, action: str) -> bool:
+    def _compact(self):
+        """Перестраивает кучу, когда в ней накопилось много устаревших элементов"""
+        self._heap = [(expires_at, key) for key, expires_at in self.cooldowns.items()]
+        heapq.heapify(self._heap)
+    
+    def is_on_cooldown(self, user_id: int, action: str, guild_id: int = 0) -> bool:
         """Проверяет, находится ли действие на кулдауне"""
-        key = f"{user_id}_{action}"
-        if key in self.cooldowns:
-            return datetime.utcnow() < self.cooldowns[key]
-        return False
+        expires_at = self.cooldowns.get((guild_id, user_id, action))
+        return expires_at is not None and time.monotonic() < expires_at
     
-    def set_cooldown(self, user_id: int, action: str, seconds: int):
+    def set_cooldown(self, user_id: int, action: str, seconds: int, guild_id: int = 0):
         """Устанавливает кулдаун на действие"""
-        from datetime import timedelta
-        key = f"{user_id}_{action}"
-        self.cooldowns[key] = datetime.utcnow() + timedelta(seconds=seconds)
+        now = time.monotonic()
+        self._purge(now)
+        
+        key = (guild_id, user_id, action)
+        expires_at = now + seconds
+        self.cooldowns[key] = expires_at
+        heapq.heappush(self._heap, (expires_at, key))
+        
+        if len(self._heap) > 2 * len(self.cooldowns) + 64:
+            self._compact()
     
-    def get_remaining(self, user_id: int, action: str) -> int:
+    def get_remaining(self, user_id: int, action: str, guild_id: int = 0) -> int:
         """Получает оставшееся время кулдауна в секундах"""
-        key = f"{user_id}_{action}"
-        if key in self.cooldowns:
-            remaining = (self.cooldowns[key] - datetime.utcnow()).total_seconds()
-            return max(0, int(remaining))
-        return 0
-    
-    def clear_cooldown(self, user_id: int, action: str):
-        """Очищает кулдаун"""
-        key = f"{user_id}_{action}"
-        if key in self.cooldowns:
-            del self.cooldowns[key]
+        expires_at = self.cooldowns.get((guild_id, user_id, action))
+        if expires_at is None:
+            return 0
+        return max(0, int(expires_at - time.monotonic()))
+    
+    def clear_cooldown(self, user_id: int, action: str, guild_id: int = 0):
+        """Очищает кулдаун (элемент кучи станет устаревшим и уйдет при вычистке)"""
+        self.cooldowns.pop((guild_id, user_id, action), None)
 
 # Глобальный менеджер кулдаунов
 cooldown_manager = CooldownManager()
@@ -0,0 +1,109 @@
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Leetspeak: цифры и символы, которыми заменяют буквы
+LEET_MAP = {
+    "0": "o", "1": "i", "3": "e", "4": "a", "5": "s",
+    "7": "t", "8": "b", "@": "a", "$": "s", "!": "i", "|": "l"
+}
+
+# Кириллические буквы, похожие на латинские (сводим к латинице)
+HOMOGLYPH_MAP = {
+    "а": "a", "в": "b", "е": "e", "ё": "e", "к": "k", "м": "m", "н": "h",
+    "о": "o", "р": "p", "с": "c", "т": "t", "у": "y", "х": "x", "і": "i", "ј": "j"
+}
+
+class WordFilter:
+    """
+    Поиск запрещенных слов автоматом Ахо-Корасик.
+    Автомат строится один раз при смене списка, проверка сообщения
+    занимает O(длина текста) независимо от количества слов.
+    """
+
+    def __init__(self, words: Iterable[str] = (), whole_words: bool = False,
+                 leetspeak: bool = True, homoglyphs: bool = True):
+        self.whole_words = whole_words
+        self.leetspeak = leetspeak
+        self.homoglyphs = homoglyphs
+
+        mapping = {}
+        if homoglyphs:
+            mapping.update(HOMOGLYPH_MAP)
+        if leetspeak:
+            mapping.update(LEET_MAP)
+        self._table = str.maketrans(mapping)
+
+        self.words: List[str] = []
+        self._build(words)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def normalize(self, text: str) -> str:
+        """Приводит текст к виду, в котором ищутся слова"""
+        return text.lower().translate(self._table)
+
+    def _build(self, words: Iterable[str]):
+        """Строит бор и суффиксные ссылки"""
+        goto: List[Dict[str, int]] = [{}]
+        output: List[Tuple[Tuple[int, str], ...]] = [()]
+
+        for word in words:
+            pattern = self.normalize(word.strip())
+            if not pattern:
+                continue
+            self.words.append(word)
+
+            node = 0
+            for char in pattern:
+                nxt = goto[node].get(char)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[node][char] = nxt
+                    goto.append({})
+                    output.append(())
+                node = nxt
+            output[node] += ((len(pattern), word),)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in goto[node].items():
+                state = fail[node]
+                while state and char not in goto[state]:
+                    state = fail[state]
+                fail[child] = goto[state].get(char, 0)
+                # Слова, оканчивающиеся в суффиксе, тоже оканчиваются здесь
+                output[child] += output[fail[child]]
+                queue.append(child)
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    def _is_whole_word(self, text: str, start: int, end: int) -> bool:
+        if start > 0 and text[start - 1].isalnum():
+            return False
+        if end < len(text) and text[end].isalnum():
+            return False
+        return True
+
+    def find(self, text: str) -> Optional[str]:
+        """Возвращает первое найденное запрещенное слово или None"""
+        if not self.words:
+            return None
+
+        goto, fail, output = self._goto, self._fail, self._output
+        # Границы слов проверяем до замены символов: "ass!" - целое слово, хотя "!" -> "i"
+        lowered = text.lower()
+        node = 0
+        for index, char in enumerate(lowered.translate(self._table)):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            if output[node]:
+                for length, word in output[node]:
+                    if not self.whole_words or self._is_whole_word(lowered, index - length + 1, index + 1):
+                        return word
+        return None